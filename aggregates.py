@@ -0,0 +1,81 @@
+RECENT_SLOTS = 10
+
+
+class RunningAggregate:
+    def __init__(self, count=0, total=0, total_sq=0, best=None, recent=None, position=0,
+                 day=None, day_count=0, day_total=0):
+        self.count = count
+        self.total = total
+        self.total_sq = total_sq
+        self.best = best
+        self.recent = list(recent or [])
+        self.position = position
+        self.day = day
+        self.day_count = day_count
+        self.day_total = day_total
+
+    @classmethod
+    def from_dict(cls, data):
+        if not data:
+            return cls()
+        return cls(
+            count=data.get("Count", 0),
+            total=data.get("Sum", 0),
+            total_sq=data.get("Sum_Sq", 0),
+            best=data.get("Max"),
+            recent=data.get("Recent"),
+            position=data.get("Position", 0),
+            day=data.get("Day"),
+            day_count=data.get("Day_Count", 0),
+            day_total=data.get("Day_Sum", 0),
+        )
+
+    @classmethod
+    def from_scores(cls, scores, date=None):
+        aggregate = cls()
+        aggregate.add(scores, date)
+        return aggregate
+
+    def to_dict(self):
+        return {
+            "Count": self.count,
+            "Sum": self.total,
+            "Sum_Sq": self.total_sq,
+            "Max": self.best,
+            "Recent": list(self.recent),
+            "Position": self.position,
+            "Day": self.day,
+            "Day_Count": self.day_count,
+            "Day_Sum": self.day_total,
+        }
+
+    def add(self, scores, date=None):
+        if date is not None and date != self.day:
+            if self.day is None or date > self.day:
+                self.day = date
+                self.day_count = 0
+                self.day_total = 0
+        for score in scores:
+            self.count += 1
+            self.total += score
+            self.total_sq += score * score
+            if self.best is None or score > self.best:
+                self.best = score
+            if len(self.recent) < RECENT_SLOTS:
+                self.recent.append(score)
+            else:
+                self.recent[self.position] = score
+            self.position = (self.position + 1) % RECENT_SLOTS
+            if date is None or date == self.day:
+                self.day_count += 1
+                self.day_total += score
+        return self
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def day_mean(self):
+        return self.day_total / self.day_count if self.day_count else None
+
+    def recent_mean(self):
+        return sum(self.recent) / len(self.recent) if self.recent else None
@@ -0,0 +1,72 @@
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+PERIODS = ("day", "week", "month", "year", "all")
+
+
+def period_start(today, period):
+    if period == "day":
+        return today
+    elif period == "week":
+        return today - timedelta(days=today.weekday())
+    elif period == "month":
+        return today.replace(day=1)
+    elif period == "year":
+        return today.replace(month=1, day=1)
+    elif period == "all":
+        return None
+    raise ValueError(f"Unknown period '{period}'.")
+
+
+def to_ordinals(dates):
+    dates = np.asarray(dates, dtype=object)
+    if not len(dates):
+        return np.empty(0, dtype=np.int64)
+    unique_dates, inverse = np.unique(dates, return_inverse=True)
+    parsed = pd.to_datetime(unique_dates, format="%Y-%m-%d").values.astype("datetime64[D]").astype(np.int64)
+    return parsed[inverse]
+
+
+def date_ordinal(day):
+    return int(np.datetime64(day, "D").astype(np.int64))
+
+
+class ScoreTable:
+    def __init__(self, tasks, scores, ordinals):
+        self.codes, self.tasks = pd.factorize(np.asarray(tasks, dtype=object))
+        self.scores = np.asarray(scores, dtype=np.float64)
+        self.ordinals = np.asarray(ordinals, dtype=np.int64)
+
+    @classmethod
+    def from_records(cls, records):
+        records = list(records)
+        if not records:
+            return cls([], [], [])
+        tasks, dates, scores = zip(*records)
+        return cls(tasks, scores, to_ordinals(dates))
+
+    def __len__(self):
+        return len(self.scores)
+
+    def period_stats(self, today=None, periods=PERIODS):
+        today = today or date.today()
+        size = len(self.tasks)
+        columns = {}
+        for period in periods:
+            start = period_start(today, period)
+            if start is None:
+                codes, scores = self.codes, self.scores
+            else:
+                mask = self.ordinals >= date_ordinal(start)
+                codes, scores = self.codes[mask], self.scores[mask]
+            count = np.bincount(codes, minlength=size)
+            total = np.bincount(codes, weights=scores, minlength=size)
+            best = np.full(size, np.nan)
+            np.fmax.at(best, codes, scores)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                columns[f"avg_{period}"] = np.round(total / count, 2)
+            columns[f"count_{period}"] = count
+            columns[f"max_{period}"] = best
+        return pd.DataFrame(columns, index=pd.Index(self.tasks, name="task"))
@@ -0,0 +1,66 @@
+import asyncio
+
+FETCH_CHUNK = 100
+CONCURRENCY = 8
+
+_loop = None
+
+
+def run(coroutine):
+    global _loop
+    if _loop is None:
+        _loop = asyncio.new_event_loop()
+    return _loop.run_until_complete(coroutine)
+
+
+def async_client(cred_path="cred.json"):
+    from storage import firestore_client
+
+    firestore_client(cred_path)
+    from firebase_admin import firestore_async
+
+    return firestore_async.client()
+
+
+async def _gather_limited(coroutines, limit):
+    semaphore = asyncio.Semaphore(limit)
+
+    async def run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*(run(coroutine) for coroutine in coroutines))
+
+
+async def _get_documents(client, paths, limit):
+    async def fetch(chunk):
+        refs = [client.document(path) for path in chunk]
+        return [(snapshot.reference.path, snapshot.to_dict()) async for snapshot in client.get_all(refs)]
+
+    chunks = [paths[i:i + FETCH_CHUNK] for i in range(0, len(paths), FETCH_CHUNK)]
+    documents = dict.fromkeys(paths)
+    for results in await _gather_limited([fetch(chunk) for chunk in chunks], limit):
+        documents.update(results)
+    return documents
+
+
+async def _get_collections(client, paths, limit):
+    async def fetch(path):
+        return [(snapshot.id, snapshot.to_dict()) async for snapshot in client.collection(path).stream()]
+
+    results = await _gather_limited([fetch(path) for path in paths], limit)
+    return dict(zip(paths, results))
+
+
+def get_documents(client, paths, limit=CONCURRENCY):
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    return run(_get_documents(client, paths, limit))
+
+
+def get_collections(client, paths, limit=CONCURRENCY):
+    paths = list(dict.fromkeys(paths))
+    if not paths:
+        return {}
+    return run(_get_collections(client, paths, limit))
@@ -0,0 +1,41 @@
+import math
+import random
+from datetime import date, timedelta
+
+from storage import Write, new_task
+
+
+def generate_profile(tasks=50, days=30, reps=10, playlists=5, playlist_size=10, seed=0, end=None):
+    rng = random.Random(seed)
+    end = end or date.today()
+    names = [f"Scenario {index:04d}" for index in range(tasks)]
+    profile = {"tasks": {}, "sessions": [], "playlists": {}}
+
+    for name in names:
+        base = rng.uniform(400, 3000)
+        gain = rng.uniform(0.05, 0.4)
+        noise = rng.uniform(0.03, 0.08)
+        sensitivity = round(rng.uniform(20, 60), 1)
+        best = 0
+        for day in range(days):
+            session_date = end - timedelta(days=days - 1 - day)
+            level = base * (1 + gain * math.log1p(day) / math.log1p(max(days, 2)))
+            scores = [round(max(level * rng.gauss(1, noise), 0), 2) for _ in range(reps)]
+            best = max(best, *scores)
+            stamp = session_date.isoformat()
+            profile["sessions"].append((name, scores, sensitivity, stamp, f"{stamp}_{rng.randrange(86400):06d}"))
+        profile["tasks"][name] = round(base)
+
+    for index in range(playlists):
+        members = rng.sample(names, min(playlist_size, len(names)))
+        profile["playlists"][f"Playlist {index:02d}"] = members
+    return profile
+
+
+def load_profile(tracker, profile):
+    writes = [Write("set", "tasks", name, new_task(name, highscore))
+              for name, highscore in profile["tasks"].items()]
+    writes += [Write("set", "playlists", name, {"playlist_name": name, "tasks": members})
+               for name, members in profile["playlists"].items()]
+    tracker.storage.commit(writes)
+    tracker.record_sessions(sorted(profile["sessions"], key=lambda session: session[3]))
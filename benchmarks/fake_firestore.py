@@ -0,0 +1,317 @@
+import copy
+import json
+import uuid
+
+from google.api_core.exceptions import Aborted, NotFound
+from google.cloud.firestore_v1 import transforms
+
+OPERATORS = {
+    "==": lambda a, b: a == b,
+    "!=": lambda a, b: a != b,
+    "<": lambda a, b: a < b,
+    "<=": lambda a, b: a <= b,
+    ">": lambda a, b: a > b,
+    ">=": lambda a, b: a >= b,
+    "in": lambda a, b: a in b,
+    "array_contains": lambda a, b: isinstance(a, list) and b in a,
+}
+
+
+def payload_size(data):
+    return len(json.dumps(data, default=str)) if data else 0
+
+
+def resolve(current, data):
+    result = dict(current or {})
+    for key, value in data.items():
+        if value is transforms.DELETE_FIELD:
+            result.pop(key, None)
+        elif isinstance(value, transforms.Increment):
+            result[key] = (result.get(key) or 0) + value.value
+        elif isinstance(value, transforms.Maximum):
+            result[key] = value.value if result.get(key) is None else max(result[key], value.value)
+        elif isinstance(value, transforms.ArrayUnion):
+            existing = list(result.get(key) or [])
+            result[key] = existing + [item for item in value.values if item not in existing]
+        elif value is transforms.SERVER_TIMESTAMP:
+            from datetime import datetime, timezone
+
+            result[key] = datetime.now(timezone.utc)
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+class FakeSnapshot:
+    def __init__(self, reference, data):
+        self.reference = reference
+        self.id = reference.id
+        self._data = data
+
+    @property
+    def exists(self):
+        return self._data is not None
+
+    def to_dict(self):
+        return copy.deepcopy(self._data)
+
+    def get(self, field):
+        return (self._data or {}).get(field)
+
+
+class FakeDocument:
+    def __init__(self, client, path):
+        self.client = client
+        self.path = path
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        return FakeCollection(self.client, self.path.rsplit("/", 1)[0])
+
+    def collection(self, name):
+        return FakeCollection(self.client, f"{self.path}/{name}")
+
+    def get(self, transaction=None):
+        snapshot = self.client._read(self)
+        if transaction is not None:
+            transaction.reads[self.path] = snapshot._data
+        return snapshot
+
+    def set(self, data, merge=False):
+        self.client._write(self.path, data, merge=merge)
+
+    def update(self, data):
+        self.client._write(self.path, data, must_exist=True)
+
+    def delete(self):
+        self.client._delete(self.path)
+
+
+class FakeQuery:
+    def __init__(self, client, path=None, group=None, filters=(), orders=(), limit=None, fields=None, cursor=None):
+        self.client = client
+        self.path = path
+        self.group = group
+        self.filters = tuple(filters)
+        self.orders = tuple(orders)
+        self._limit = limit
+        self.fields = fields
+        self.cursor = cursor
+
+    def _copy(self, **changes):
+        state = dict(path=self.path, group=self.group, filters=self.filters, orders=self.orders,
+                     limit=self._limit, fields=self.fields, cursor=self.cursor)
+        state.update(changes)
+        return FakeQuery(self.client, **state)
+
+    def where(self, field_path=None, op_string=None, value=None, filter=None):
+        if filter is not None:
+            field_path, op_string, value = filter.field_path, filter.op_string, filter.value
+        return self._copy(filters=self.filters + ((field_path, op_string, value),))
+
+    def order_by(self, field_path, direction="ASCENDING"):
+        return self._copy(orders=self.orders + ((field_path, direction),))
+
+    def limit(self, count):
+        return self._copy(limit=count)
+
+    def select(self, fields):
+        return self._copy(fields=list(fields))
+
+    def start_after(self, snapshot):
+        return self._copy(cursor=snapshot)
+
+    def _key(self, path, data):
+        return tuple(path if field == "__name__" else data.get(field) for field, _ in self.orders)
+
+    def _matches(self, data):
+        for field, op, value in self.filters:
+            if field not in data or not OPERATORS[op](data[field], value):
+                return False
+        return all(field == "__name__" or field in data for field, _ in self.orders)
+
+    def stream(self):
+        documents = [(path, data) for path, data in self.client._scan(self.path, self.group) if self._matches(data)]
+        documents.sort(key=lambda item: self._key(*item) if self.orders else item[0])
+        if self.cursor is not None:
+            after = self._key(self.cursor.reference.path, self.cursor._data)
+            documents = [item for item in documents if self._key(*item) > after]
+        if self._limit is not None:
+            documents = documents[:self._limit]
+        self.client.reads += max(len(documents), 1)
+        for path, data in documents:
+            if self.fields is not None:
+                data = {field: data[field] for field in self.fields if field in data}
+            self.client.read_bytes += payload_size(data)
+            yield FakeSnapshot(FakeDocument(self.client, path), copy.deepcopy(data))
+
+    def get(self):
+        return list(self.stream())
+
+
+class FakeCollection(FakeQuery):
+    def __init__(self, client, path):
+        super().__init__(client, path=path)
+        self.id = path.rsplit("/", 1)[-1]
+
+    @property
+    def parent(self):
+        if "/" not in self.path:
+            return None
+        return FakeDocument(self.client, self.path.rsplit("/", 1)[0])
+
+    def document(self, document_id=None):
+        return FakeDocument(self.client, f"{self.path}/{document_id or uuid.uuid4().hex[:20]}")
+
+    def add(self, data):
+        ref = self.document()
+        ref.set(data)
+        return None, ref
+
+    def list_documents(self, page_size=None):
+        return [FakeDocument(self.client, path) for path, _ in self.client._scan(self.path)]
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.ops = []
+
+    def set(self, ref, data, merge=False):
+        self.ops.append(("set", ref, data, merge))
+
+    def update(self, ref, data):
+        self.ops.append(("update", ref, data, False))
+
+    def delete(self, ref):
+        self.ops.append(("delete", ref, None, False))
+
+    def commit(self):
+        if len(self.ops) > 500:
+            raise ValueError("A batch may contain at most 500 writes.")
+        for kind, ref, data, merge in self.ops:
+            if kind == "delete":
+                self.client._delete(ref.path)
+            else:
+                self.client._write(ref.path, data, merge=merge, must_exist=kind == "update")
+        self.client.commits += 1
+
+
+class FakeTransaction(FakeBatch):
+    def __init__(self, client, max_attempts=5):
+        super().__init__(client)
+        self._max_attempts = max_attempts
+        self._read_only = False
+        self._id = None
+        self.reads = {}
+
+    def _clean_up(self):
+        self.ops = []
+        self.reads = {}
+        self._id = None
+
+    def _begin(self, retry_id=None):
+        self._id = uuid.uuid4().bytes
+
+    def _rollback(self):
+        self._clean_up()
+
+    def _commit(self):
+        for path, data in self.reads.items():
+            if self.client.collections.get(path.rsplit("/", 1)[0], {}).get(path) != data:
+                self._clean_up()
+                raise Aborted(f"Document {path} changed during the transaction.")
+        self.commit()
+        self._clean_up()
+
+
+class FakeFirestore:
+    def __init__(self):
+        self.collections = {}
+        self.reset_counters()
+
+    def reset_counters(self):
+        self.reads = 0
+        self.writes = 0
+        self.deletes = 0
+        self.commits = 0
+        self.read_bytes = 0
+        self.write_bytes = 0
+
+    def counters(self):
+        return {
+            "reads": self.reads,
+            "writes": self.writes,
+            "deletes": self.deletes,
+            "commits": self.commits,
+            "read_bytes": self.read_bytes,
+            "write_bytes": self.write_bytes,
+        }
+
+    def collection(self, path):
+        return FakeCollection(self, path)
+
+    def document(self, path):
+        return FakeDocument(self, path)
+
+    def collection_group(self, name):
+        return FakeQuery(self, group=name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+    def transaction(self, max_attempts=5):
+        return FakeTransaction(self, max_attempts)
+
+    def get_all(self, refs):
+        return [ref.get() for ref in refs]
+
+    def _scan(self, path=None, group=None):
+        if group is None:
+            return list(self.collections.get(path, {}).items())
+        return [item for collection, documents in self.collections.items()
+                if collection.rsplit("/", 1)[-1] == group for item in documents.items()]
+
+    def _read(self, ref):
+        data = self.collections.get(ref.parent.path, {}).get(ref.path)
+        self.reads += 1
+        self.read_bytes += payload_size(data)
+        return FakeSnapshot(ref, copy.deepcopy(data))
+
+    def _write(self, path, data, merge=False, must_exist=False):
+        collection = self.collections.setdefault(path.rsplit("/", 1)[0], {})
+        current = collection.get(path)
+        if must_exist and current is None:
+            raise NotFound(f"No document to update: {path}")
+        collection[path] = resolve(current if merge or must_exist else None, data)
+        self.writes += 1
+        self.write_bytes += payload_size(data)
+
+    def _delete(self, path):
+        self.collections.get(path.rsplit("/", 1)[0], {}).pop(path, None)
+        self.deletes += 1
+
+
+class FakeAsyncCollection:
+    def __init__(self, collection):
+        self.collection = collection
+
+    async def stream(self):
+        for snapshot in self.collection.stream():
+            yield snapshot
+
+
+class FakeAsyncFirestore:
+    def __init__(self, client):
+        self.client = client
+
+    def document(self, path):
+        return self.client.document(path)
+
+    def collection(self, path):
+        return FakeAsyncCollection(self.client.collection(path))
+
+    async def get_all(self, refs):
+        for ref in refs:
+            yield ref.get()
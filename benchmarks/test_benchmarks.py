@@ -0,0 +1,85 @@
+import contextlib
+import io
+import tracemalloc
+from datetime import date
+
+import pytest
+
+pytest.importorskip("pytest_benchmark")
+
+from benchmarks.data import generate_profile, load_profile
+from benchmarks.fake_firestore import FakeAsyncFirestore, FakeFirestore
+from storage import FirestoreStorage
+from tracker import Tracker
+
+SIZES = {
+    "small": dict(tasks=20, days=14, reps=5, playlists=2),
+    "medium": dict(tasks=100, days=30, reps=10, playlists=5),
+    "large": dict(tasks=300, days=90, reps=10, playlists=10, playlist_size=40),
+}
+
+
+@pytest.fixture(scope="module", params=list(SIZES))
+def profile(request):
+    client = FakeFirestore()
+    profile = generate_profile(**SIZES[request.param])
+    with contextlib.redirect_stdout(io.StringIO()):
+        load_profile(make_tracker(client), profile)
+    return client, profile
+
+
+def make_tracker(client):
+    return Tracker(FirestoreStorage(db=client, async_db=FakeAsyncFirestore(client)))
+
+
+def measure(benchmark, client, operation):
+    def setup():
+        client.reset_counters()
+        return (make_tracker(client),), {}
+
+    def run(tracker):
+        with contextlib.redirect_stdout(io.StringIO()):
+            operation(tracker)
+
+    benchmark.pedantic(run, setup=setup, rounds=5, iterations=1)
+    benchmark.extra_info.update(client.counters())
+
+    client.reset_counters()
+    tracker = make_tracker(client)
+    tracemalloc.start()
+    run(tracker)
+    benchmark.extra_info["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+
+
+def test_record_session(benchmark, profile):
+    client, data = profile
+    task = next(iter(data["tasks"]))
+    today = date.today().isoformat()
+    measure(benchmark, client, lambda tracker: tracker.record_session(task, [1000.0, 1100.0, 1050.0], 40.0, today))
+
+
+@pytest.mark.parametrize("period", ["day", "week", "month", "all"])
+def test_view_data(benchmark, profile, period):
+    client, _ = profile
+    measure(benchmark, client, lambda tracker: tracker.view_data(period))
+
+
+def test_refresh(benchmark, profile):
+    client, _ = profile
+    measure(benchmark, client, lambda tracker: tracker.refresh())
+
+
+def test_playlist_flow(benchmark, profile):
+    client, data = profile
+    playlist = next(iter(data["playlists"]))
+
+    def flow(tracker):
+        tracker.view_playlists()
+        tracker.view_tasks_playlist(playlist)
+        tracker.current_playlist = playlist
+        for task in tracker.storage.get_playlist(playlist)["tasks"]:
+            tracker.current_task = task
+            tracker.view_task_data()
+
+    measure(benchmark, client, flow)
@@ -0,0 +1,243 @@
+import time
+from collections import OrderedDict
+
+from storage import PAGE_SIZE, Storage, apply_fields
+
+MISSING = object()
+
+
+class TTLCache:
+    def __init__(self, maxsize=512, ttl=300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return MISSING
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+
+    def peek(self, key):
+        entry = self.entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return MISSING
+        return entry[1]
+
+    def put(self, key, value):
+        self.entries[key] = (time.monotonic() + self.ttl, value)
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        for key in keys:
+            self.entries.pop(key, None)
+
+    def invalidate_kind(self, kind):
+        for key in [key for key in self.entries if key[0] == kind]:
+            del self.entries[key]
+
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else None,
+            "size": len(self.entries),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl,
+        }
+
+
+class CachedStorage(Storage):
+    def __init__(self, storage, maxsize=512, ttl=300):
+        self.storage = storage
+        self.cache = TTLCache(maxsize, ttl)
+
+    def _cached(self, key, loader):
+        value = self.cache.get(key)
+        if value is MISSING:
+            value = loader()
+            self.cache.put(key, value)
+        return value
+
+    def _invalidate_listings(self, kind):
+        self.cache.invalidate_kind(f"{kind}_names")
+
+    def _key(self, write):
+        if write.collection == "sessions":
+            self.cache.invalidate(("sessions", write.key[0]))
+            return None
+        if write.collection == "rollups":
+            self.cache.invalidate(("rollups", write.key[1]), ("rollup", tuple(write.key)))
+            return None
+        kind = "task" if write.collection == "tasks" else "playlist"
+        self._invalidate_listings(kind)
+        return kind, write.key
+
+    def _invalidate(self, write):
+        key = self._key(write)
+        if key:
+            self.cache.invalidate(key)
+
+    def _apply(self, write):
+        key = self._key(write)
+        if key is None:
+            return
+        if write.kind == "delete":
+            self.cache.put(key, None)
+        elif write.kind == "set":
+            self.cache.put(key, apply_fields({}, write.data))
+        else:
+            current = self.cache.peek(key)
+            if current is MISSING or current is None:
+                self.cache.invalidate(key)
+            else:
+                self.cache.put(key, apply_fields(current, write.data))
+
+    def commit(self, writes, progress=None):
+        try:
+            result = self.storage.commit(writes, progress)
+        except Exception:
+            for write in writes:
+                self._invalidate(write)
+            raise
+        for write in writes:
+            self._apply(write)
+        return result
+
+    def transact_task(self, name, build):
+        attempt = {}
+
+        def capture(data):
+            attempt["data"] = data
+            attempt["writes"], result = build(data)
+            return attempt["writes"], result
+
+        try:
+            result = self.storage.transact_task(name, capture)
+        except Exception:
+            self.cache.invalidate(("task", name))
+            raise
+        self.cache.put(("task", name), attempt["data"])
+        for write in attempt["writes"] or []:
+            self._apply(write)
+        return result
+
+    def stats(self):
+        return self.cache.stats()
+
+    def get_task(self, name):
+        return self._cached(("task", name), lambda: self.storage.get_task(name))
+
+    def delete_task(self, name):
+        deleted = self.storage.delete_task(name)
+        self.cache.put(("task", name), None)
+        self._invalidate_listings("task")
+        self.cache.invalidate(("sessions", name))
+        self.cache.invalidate_kind("rollups")
+        self.cache.invalidate_kind("rollup")
+        return deleted
+
+    def delete_all_tasks(self, progress=None):
+        deleted = self.storage.delete_all_tasks(progress)
+        for kind in ("task", "task_names", "sessions", "rollups", "rollup"):
+            self.cache.invalidate_kind(kind)
+        return deleted
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        return self.storage.iter_tasks(fields, page_size)
+
+    def list_tasks(self, fields=None):
+        return self.storage.list_tasks(fields)
+
+    def dirty_tasks(self, fields=None):
+        return self.storage.dirty_tasks(fields)
+
+    def task_names(self):
+        return self._cached(("task_names",), self.storage.task_names)
+
+    def get_tasks(self, names):
+        tasks = {}
+        missing = []
+        for name in names:
+            value = self.cache.get(("task", name))
+            if value is MISSING:
+                missing.append(name)
+            else:
+                tasks[name] = value
+        if missing:
+            for name, data in self.storage.get_tasks(missing).items():
+                self.cache.put(("task", name), data)
+                tasks[name] = data
+        return tasks
+
+    def get_sessions_many(self, tasks):
+        sessions = {}
+        missing = []
+        for task in tasks:
+            value = self.cache.get(("sessions", task))
+            if value is MISSING:
+                missing.append(task)
+            else:
+                sessions[task] = value
+        if missing:
+            for task, task_sessions in self.storage.get_sessions_many(missing).items():
+                self.cache.put(("sessions", task), task_sessions)
+                sessions[task] = task_sessions
+        return sessions
+
+    def get_sessions(self, task, since=None):
+        sessions = self._cached(("sessions", task), lambda: self.storage.get_sessions(task))
+        return [(session_id, data) for session_id, data in sessions if not since or data.get("Date", "") >= since]
+
+    def get_rollups(self, bucket):
+        return self._cached(("rollups", bucket), lambda: self.storage.get_rollups(bucket))
+
+    def get_rollups_many(self, keys):
+        rollups = {}
+        missing = []
+        for key in keys:
+            key = tuple(key)
+            value = self.cache.get(("rollup", key))
+            if value is MISSING:
+                missing.append(key)
+            else:
+                rollups[key] = value
+        if missing:
+            for key, data in self.storage.get_rollups_many(missing).items():
+                self.cache.put(("rollup", key), data)
+                rollups[key] = data
+        return rollups
+
+    def get_playlist(self, name):
+        return self._cached(("playlist", name), lambda: self.storage.get_playlist(name))
+
+    def delete_playlist(self, name):
+        deleted = self.storage.delete_playlist(name)
+        self.cache.put(("playlist", name), None)
+        self._invalidate_listings("playlist")
+        return deleted
+
+    def delete_all_playlists(self, progress=None):
+        deleted = self.storage.delete_all_playlists(progress)
+        for kind in ("playlist", "playlist_names"):
+            self.cache.invalidate_kind(kind)
+        return deleted
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        return self.storage.iter_playlists(fields, page_size)
+
+    def list_playlists(self, fields=None):
+        return self.storage.list_playlists(fields)
+
+    def playlist_names(self):
+        return self._cached(("playlist_names",), self.storage.playlist_names)
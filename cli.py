@@ -0,0 +1,184 @@
+import argparse
+import csv
+import json
+import sys
+
+
+def positive_int(value):
+    number = int(value)
+    if number <= 0:
+        raise argparse.ArgumentTypeError("must be a positive integer")
+    return number
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="tracker.py", description="KovaaK's progress tracker")
+    parser.add_argument("--storage", choices=["firestore", "sqlite", "synced", "live"], help="storage backend (default: TRACKER_STORAGE)")
+    parser.add_argument("--timing", action="store_true", help="print import and initialization costs on exit")
+    parser.add_argument("--queue", action="store_true", help="queue writes in a local log and send them in the background")
+    parser.add_argument("--profile", action="store_true", help="print storage latency and document counts on exit")
+    parser.add_argument("--metrics-out", metavar="PATH", help="write storage metrics on exit (.prom for Prometheus, else JSON)")
+    commands = parser.add_subparsers(dest="command", help="run one command and exit (default: interactive menu)")
+
+    task = commands.add_parser("task", help="manage tasks").add_subparsers(dest="action", required=True)
+    task.add_parser("list")
+    show = task.add_parser("show")
+    show.add_argument("name")
+    history = task.add_parser("history", help="per-day reps, averages and threshold results")
+    history.add_argument("name")
+    create = task.add_parser("create")
+    create.add_argument("name")
+    create.add_argument("--highscore", type=positive_int, required=True)
+    edit = task.add_parser("edit")
+    edit.add_argument("name")
+    edit.add_argument("--highscore", type=positive_int, required=True)
+    delete = task.add_parser("delete")
+    delete.add_argument("name")
+    delete_all = task.add_parser("delete-all")
+    delete_all.add_argument("--yes", action="store_true", required=True)
+
+    playlist = commands.add_parser("playlist", help="manage playlists").add_subparsers(dest="action", required=True)
+    playlist.add_parser("list")
+    show = playlist.add_parser("show")
+    show.add_argument("name")
+    summary = playlist.add_parser("summary", help="score, threshold status and completion for a playlist")
+    summary.add_argument("name")
+    create = playlist.add_parser("create")
+    create.add_argument("name")
+    create.add_argument("tasks", nargs="+")
+    delete = playlist.add_parser("delete")
+    delete.add_argument("name")
+    delete_all = playlist.add_parser("delete-all")
+    delete_all.add_argument("--yes", action="store_true", required=True)
+
+    record = commands.add_parser("record", help="record scores from arguments or stdin")
+    record.add_argument("task", nargs="?", help="task name; omit to read sessions from stdin")
+    record.add_argument("scores", nargs="*", type=float)
+    record.add_argument("--sens", type=float, help="sensitivity used for the session")
+    record.add_argument("--date", help="session date (YYYY-MM-DD, default today)")
+    record.add_argument("--format", choices=["csv", "jsonl"], help="stdin format (default: detect)")
+
+    view = commands.add_parser("view", help="show period statistics")
+    view.add_argument("period", choices=["day", "week", "month", "year", "all"])
+
+    rolling = commands.add_parser("rolling", help="show EWMA, median, percentiles and consistency per task")
+    rolling.add_argument("tasks", nargs="*", help="tasks to show (default: all)")
+
+    trends = commands.add_parser("trends", help="flag improving, plateaued and regressing tasks")
+    trends.add_argument("tasks", nargs="*", help="tasks to show (default: all)")
+
+    refresh = commands.add_parser("refresh", help="recompute task summaries for tasks with new reps")
+    refresh.add_argument("--full", action="store_true", help="recompute every task, not only those with new reps")
+    commands.add_parser("backfill", help="rebuild period rollups from stored sessions")
+
+    import_stats = commands.add_parser("import", help="import KovaaK's stats CSV files")
+    import_stats.add_argument("directory")
+    import_stats.add_argument("--full", action="store_true", help="ignore the high-water mark")
+
+    migrate = commands.add_parser("migrate", help="copy oldmain.py's playlist_task documents into this schema")
+    migrate.add_argument("--checkpoint", default="migration_state.json", help="progress file used to resume")
+    migrate.add_argument("--page-size", type=positive_int, help="documents read per page")
+    migrate.add_argument("--workers", type=positive_int, help="threads transforming each page")
+    migrate.add_argument("--restart", action="store_true", help="ignore the checkpoint and start over")
+    migrate.add_argument("--delete-source", action="store_true", help="delete the old documents once verified")
+
+    watch = commands.add_parser("watch", help="record new KovaaK's runs as they are written")
+    watch.add_argument("directory")
+    return parser
+
+
+def read_sessions(stream, default_format=None, sensitivity=None, date=None):
+    lines = [line for line in stream if line.strip()]
+    if not lines:
+        return []
+    data_format = default_format or ("jsonl" if lines[0].lstrip().startswith("{") else "csv")
+
+    sessions = {}
+
+    def add(task, scores, sens, day):
+        key = (task, day or date, sens if sens is not None else sensitivity)
+        sessions.setdefault(key, []).extend(scores)
+
+    if data_format == "jsonl":
+        for line in lines:
+            entry = json.loads(line)
+            scores = entry["scores"] if "scores" in entry else [entry["score"]]
+            add(entry["task"], [float(score) for score in scores], entry.get("sensitivity"), entry.get("date"))
+    else:
+        for row in csv.reader(lines):
+            if not row or row[0].strip().lower() == "task":
+                continue
+            task, score = row[0].strip(), float(row[1])
+            sens = float(row[2]) if len(row) > 2 and row[2].strip() else None
+            day = row[3].strip() if len(row) > 3 and row[3].strip() else None
+            add(task, [score], sens, day)
+
+    return [(task, scores, sens, day, None) for (task, day, sens), scores in sessions.items()]
+
+
+def record(tracker, args):
+    if args.task and args.scores:
+        sessions = [(args.task, args.scores, args.sens, args.date, None)]
+    elif args.task:
+        scores = [float(token) for line in sys.stdin for token in line.replace(",", " ").split()]
+        sessions = [(args.task, scores, args.sens, args.date, None)]
+    else:
+        sessions = read_sessions(sys.stdin, args.format, args.sens, args.date)
+
+    written, skipped = tracker.record_sessions(sessions)
+    reps = sum(len(scores) for task, scores, _, _, _ in sessions if task not in skipped)
+    print(f"Recorded {reps} reps in {len(sessions) - len(skipped)} sessions ({written} documents written).")
+    for task in sorted(set(skipped)):
+        print(f"No data found for the task '{task}'.")
+    return 1 if skipped else 0
+
+
+def run(tracker, args):
+    if args.command == "task":
+        if args.action == "list":
+            tracker.view_all_tasks()
+        elif args.action == "show":
+            tracker.current_task = args.name
+            tracker.view_task_data()
+        elif args.action == "history":
+            tracker.view_task_history(args.name)
+        elif args.action == "create":
+            tracker.create_task(args.name, args.highscore)
+        elif args.action == "edit":
+            tracker.edit_task(args.name, args.highscore)
+        elif args.action == "delete":
+            tracker.delete_task(args.name)
+        elif args.action == "delete-all":
+            tracker.delete_all_tasks()
+    elif args.command == "playlist":
+        if args.action == "list":
+            tracker.view_playlists()
+        elif args.action == "show":
+            tracker.view_tasks_playlist(args.name)
+        elif args.action == "summary":
+            tracker.view_playlist_summary(args.name)
+        elif args.action == "create":
+            tracker.create_playlist(args.name, args.tasks)
+        elif args.action == "delete":
+            tracker.delete_playlist(args.name)
+        elif args.action == "delete-all":
+            tracker.delete_all_playlists()
+    elif args.command == "record":
+        return record(tracker, args)
+    elif args.command == "view":
+        tracker.view_data(args.period)
+    elif args.command == "rolling":
+        tracker.view_rolling_stats(args.tasks or None)
+    elif args.command == "trends":
+        tracker.view_trends(args.tasks or None)
+    elif args.command == "refresh":
+        tracker.refresh(full=args.full)
+    elif args.command == "backfill":
+        tracker.backfill_rollups()
+    elif args.command == "import":
+        tracker.import_stats(args.directory, full=args.full)
+    elif args.command == "migrate":
+        tracker.migrate_legacy(args.checkpoint, args.page_size, args.workers, args.restart, args.delete_source)
+    elif args.command == "watch":
+        tracker.watch_stats(args.directory)
+    return 0
@@ -0,0 +1,194 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+
+STATS_FILE_PATTERN = re.compile(r"^(?P<scenario>.+?) - .+ - (?P<stamp>\d{4}\.\d{2}\.\d{2}-\d{2}\.\d{2}\.\d{2}) Stats\.csv$")
+
+
+def parse_stats_file(path):
+    with open(path, "rb") as file:
+        content = file.read()
+
+    name = os.path.basename(path)
+    match = STATS_FILE_PATTERN.match(name)
+    run = {
+        "file": name,
+        "hash": hashlib.sha1(content).hexdigest(),
+        "scenario": match.group("scenario") if match else None,
+        "score": None,
+        "sensitivity": None,
+    }
+    if match:
+        stamp = datetime.strptime(match.group("stamp"), "%Y.%m.%d-%H.%M.%S")
+    else:
+        stamp = datetime.fromtimestamp(os.path.getmtime(path))
+    run["date"] = stamp.strftime("%Y-%m-%d")
+    run["time"] = stamp.strftime("%H%M%S")
+
+    for line in content.decode("utf-8", errors="replace").splitlines():
+        key, _, value = line.partition(",")
+        value = value.strip()
+        if key == "Score:":
+            run["score"] = round(float(value), 2)
+        elif key == "Scenario:" and value:
+            run["scenario"] = value
+        elif key == "Horiz Sens:":
+            run["sensitivity"] = float(value)
+    return run
+
+
+def load_state(state_path):
+    if not os.path.exists(state_path):
+        return {"high_water": 0, "files": {}}
+    with open(state_path) as file:
+        return json.load(file)
+
+
+def save_state(state_path, state):
+    temp_path = f"{state_path}.tmp"
+    with open(temp_path, "w") as file:
+        json.dump(state, file)
+    os.replace(temp_path, state_path)
+
+
+def scan_stats_dir(directory, state, full=False):
+    high_water = 0 if full else state.get("high_water", 0)
+    known_files = {} if full else state.get("files", {})
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if not entry.is_file() or not entry.name.endswith("Stats.csv") or entry.name in known_files:
+                continue
+            mtime = entry.stat().st_mtime
+            if mtime >= high_water:
+                yield entry.path, mtime
+
+
+def match_tasks(runs, task_names):
+    tasks_by_key = {name.lower(): name for name in task_names}
+    matched, unmatched = [], set()
+    for run in runs:
+        task_name = tasks_by_key.get((run["scenario"] or "").lower())
+        if task_name is None:
+            unmatched.add(run["scenario"])
+        else:
+            matched.append((task_name, run))
+    return matched, unmatched
+
+
+def group_sessions(matched):
+    sessions = {}
+    for task_name, run in sorted(matched, key=lambda item: (item[1]["date"], item[1]["time"])):
+        session = sessions.setdefault((task_name, run["date"]), {
+            "id": f"{run['date']}_{run['time']}",
+            "scores": [],
+            "sensitivity": None,
+        })
+        session["scores"].append(run["score"])
+        session["sensitivity"] = run["sensitivity"]
+    return [(task_name, session["scores"], session["sensitivity"], date, session["id"])
+            for (task_name, date), session in sessions.items()]
+
+
+def high_water_mark(found, state):
+    left = [mtime for path, mtime in found if os.path.basename(path) not in state.get("files", {})]
+    return min(left) if left else max(mtime for _, mtime in found)
+
+
+def drop_recorded(storage, matched):
+    stored = storage.get_sessions_many(sorted({task_name for task_name, _ in matched}))
+    remaining = {}
+    for task_name, sessions in stored.items():
+        for _, session in sessions:
+            for score in session.get("Scores") or []:
+                key = (task_name, session.get("Date"), score)
+                remaining[key] = remaining.get(key, 0) + 1
+    fresh, recorded = [], []
+    for task_name, run in matched:
+        key = (task_name, run["date"], run["score"])
+        if remaining.get(key):
+            remaining[key] -= 1
+            recorded.append(run)
+        else:
+            fresh.append((task_name, run))
+    return fresh, recorded
+
+
+def prune_files(directory, state):
+    high_water = state.get("high_water", 0)
+    for name in list(state.get("files", {})):
+        try:
+            old = os.stat(os.path.join(directory, name)).st_mtime < high_water
+        except FileNotFoundError:
+            old = True
+        if old:
+            del state["files"][name]
+
+
+def ingest_runs(tracker, runs, state, progress=None, full=False):
+    files = state.setdefault("files", {})
+    known_hashes = set(files.values())
+    fresh = []
+    duplicates = 0
+    for run in runs:
+        if run["score"] is None:
+            continue
+        if run["hash"] in known_hashes:
+            duplicates += 1
+            continue
+        known_hashes.add(run["hash"])
+        fresh.append(run)
+
+    matched, unmatched = match_tasks(fresh, tracker.storage.task_names())
+    if full and matched:
+        matched, recorded = drop_recorded(tracker.storage, matched)
+        duplicates += len(recorded)
+        files.update((run["file"], run["hash"]) for run in recorded)
+
+    by_day = {}
+    for task_name, run in matched:
+        by_day.setdefault((task_name, run["date"]), []).append(run)
+
+    def committed(task_name, batch):
+        for _, _, date, _ in batch:
+            files.update((run["file"], run["hash"]) for run in by_day.get((task_name, date), []))
+
+    sessions = group_sessions(matched)
+    written, _ = tracker.record_sessions(sessions, progress=progress, committed=committed)
+
+    recorded = set(files.values())
+    for run in runs:
+        if run["hash"] in recorded:
+            files[run["file"]] = run["hash"]
+    return {
+        "runs": len(matched),
+        "duplicates": duplicates,
+        "sessions": len(sessions),
+        "documents": written,
+        "unmatched": sorted(unmatched),
+    }
+
+
+def import_stats(tracker, directory, state_path="import_state.json", workers=None, full=False, progress=None):
+    state = load_state(state_path)
+    found = list(scan_stats_dir(directory, state, full))
+    if not found:
+        return {"runs": 0, "duplicates": 0, "sessions": 0, "documents": 0, "unmatched": []}
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    paths = [path for path, _ in found]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        runs = list(executor.map(parse_stats_file, paths, chunksize=64))
+
+    try:
+        summary = ingest_runs(tracker, runs, state, progress, full)
+    except Exception:
+        save_state(state_path, state)
+        raise
+    high_water = high_water_mark(found, state)
+    state["high_water"] = high_water if full else max(state.get("high_water", 0), high_water)
+    prune_files(directory, state)
+    save_state(state_path, state)
+    return summary
@@ -0,0 +1,155 @@
+import threading
+
+from storage import PAGE_SIZE, Storage, apply_fields, project
+
+SNAPSHOT_TIMEOUT = 10
+
+
+class LiveStorage(Storage):
+    live = True
+
+    def __init__(self, remote):
+        self.remote = remote
+        self.documents = {"tasks": {}, "playlists": {}}
+        self.loaded = {collection: threading.Event() for collection in self.documents}
+        self.lock = threading.Lock()
+        self.watches = []
+        self.changes = 0
+
+    def start(self):
+        if self.watches:
+            return
+        for collection in self.documents:
+            query = self.remote.db.collection(collection)
+            self.watches.append(query.on_snapshot(self._listener(collection)))
+
+    def close(self):
+        for watch in self.watches:
+            watch.unsubscribe()
+        self.watches = []
+
+    def _listener(self, collection):
+        documents = self.documents[collection]
+
+        def on_snapshot(snapshots, changes, read_time):
+            with self.lock:
+                for change in changes:
+                    if change.type.name == "REMOVED":
+                        documents.pop(change.document.id, None)
+                    else:
+                        documents[change.document.id] = change.document.to_dict()
+                self.changes += len(changes)
+            self.loaded[collection].set()
+
+        return on_snapshot
+
+    def _model(self, collection):
+        self.start()
+        if not self.loaded[collection].wait(SNAPSHOT_TIMEOUT):
+            print(f"Warning: still waiting for the first '{collection}' snapshot.")
+        return self.documents[collection]
+
+    def _get(self, collection, name):
+        documents = self._model(collection)
+        with self.lock:
+            data = documents.get(name)
+            return None if data is None else dict(data)
+
+    def _iter(self, collection, fields=None):
+        documents = self._model(collection)
+        with self.lock:
+            items = sorted(documents.items())
+        return iter([(name, {} if fields == [] else project(dict(data), fields)) for name, data in items])
+
+    def commit(self, writes, progress=None):
+        result = self.remote.commit(writes, progress)
+        self._apply(writes)
+        return result
+
+    def _apply(self, writes):
+        with self.lock:
+            for write in writes:
+                documents = self.documents.get(write.collection)
+                if documents is None:
+                    continue
+                if write.kind == "delete":
+                    documents.pop(write.key, None)
+                elif write.kind == "set":
+                    documents[write.key] = apply_fields({}, write.data)
+                elif write.key in documents:
+                    documents[write.key] = apply_fields(documents[write.key], write.data)
+
+    def transact_task(self, name, build):
+        attempt = {}
+
+        def capture(data):
+            attempt["data"] = data
+            attempt["writes"], result = build(data)
+            return attempt["writes"], result
+
+        result = self.remote.transact_task(name, capture)
+        with self.lock:
+            if attempt["data"] is not None:
+                self.documents["tasks"][name] = attempt["data"]
+        self._apply(attempt["writes"] or [])
+        return result
+
+    def stats(self):
+        with self.lock:
+            return {
+                "tasks": len(self.documents["tasks"]),
+                "playlists": len(self.documents["playlists"]),
+                "changes": self.changes,
+                "listening": bool(self.watches),
+            }
+
+    def get_task(self, name):
+        return self._get("tasks", name)
+
+    def get_tasks(self, names):
+        return {name: self._get("tasks", name) for name in names}
+
+    def delete_task(self, name):
+        deleted = self.remote.delete_task(name)
+        with self.lock:
+            self.documents["tasks"].pop(name, None)
+        return deleted
+
+    def delete_all_tasks(self, progress=None):
+        deleted = self.remote.delete_all_tasks(progress)
+        with self.lock:
+            self.documents["tasks"].clear()
+        return deleted
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("tasks", fields)
+
+    def get_sessions(self, task, since=None):
+        return self.remote.get_sessions(task, since)
+
+    def get_sessions_many(self, tasks):
+        return self.remote.get_sessions_many(tasks)
+
+    def get_rollups(self, bucket):
+        return self.remote.get_rollups(bucket)
+
+    def get_rollups_many(self, keys):
+        return self.remote.get_rollups_many(keys)
+
+    def get_playlist(self, name):
+        return self._get("playlists", name)
+
+    def delete_playlist(self, name):
+        deleted = self.remote.delete_playlist(name)
+        with self.lock:
+            self.documents["playlists"].pop(name, None)
+        return deleted
+
+    def delete_all_playlists(self, progress=None):
+        deleted = self.remote.delete_all_playlists(progress)
+        with self.lock:
+            self.documents["playlists"].clear()
+        return deleted
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("playlists", fields)
@@ -0,0 +1,389 @@
+import contextvars
+import functools
+import json
+import os
+import sys
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from storage import PAGE_SIZE, Storage
+
+BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CALLER_FILES = ("tracker.py", "oldmain.py", "cli.py", "importer.py", "watcher.py")
+OPERATION = contextvars.ContextVar("operation", default="-")
+
+
+def payload_size(data):
+    return len(json.dumps(data, default=str)) if data else 0
+
+
+def caller():
+    frame = sys._getframe(2)
+    while frame is not None:
+        if os.path.basename(frame.f_code.co_filename) in CALLER_FILES and frame.f_code.co_name != "<module>":
+            return frame.f_code.co_qualname
+        frame = frame.f_back
+    return OPERATION.get()
+
+
+@contextmanager
+def operation(name):
+    token = OPERATION.set(name)
+    try:
+        yield
+    finally:
+        OPERATION.reset(token)
+
+
+def attributed(function):
+    @functools.wraps(function)
+    def call(*args, **kwargs):
+        with operation(caller()):
+            return function(*args, **kwargs)
+
+    return call
+
+
+class Histogram:
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds):
+        self.counts[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, q):
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return BUCKETS[index] if index < len(BUCKETS) else float("inf")
+
+    def to_dict(self):
+        return {"count": self.count, "sum": self.sum, "buckets": dict(zip([*BUCKETS, "+Inf"], self.counts))}
+
+
+class Metrics:
+    def __init__(self):
+        self.latency = {}
+        self.documents = {}
+
+    def observe(self, method, seconds):
+        self.latency.setdefault(method, Histogram()).observe(seconds)
+
+    def count(self, operation, reads=0, writes=0, deletes=0, read_bytes=0, write_bytes=0):
+        totals = self.documents.setdefault(operation, dict.fromkeys(
+            ("reads", "writes", "deletes", "read_bytes", "write_bytes"), 0))
+        totals["reads"] += reads
+        totals["writes"] += writes
+        totals["deletes"] += deletes
+        totals["read_bytes"] += read_bytes
+        totals["write_bytes"] += write_bytes
+
+    def totals(self):
+        totals = dict.fromkeys(("reads", "writes", "deletes", "read_bytes", "write_bytes"), 0)
+        for counts in self.documents.values():
+            for key, value in counts.items():
+                totals[key] += value
+        return totals
+
+    def to_dict(self):
+        return {
+            "latency": {method: histogram.to_dict() for method, histogram in sorted(self.latency.items())},
+            "operations": dict(sorted(self.documents.items())),
+            "totals": self.totals(),
+        }
+
+    def to_prometheus(self):
+        lines = ["# TYPE tracker_storage_latency_seconds histogram"]
+        for method, histogram in sorted(self.latency.items()):
+            cumulative = 0
+            for bound, count in zip([*BUCKETS, "+Inf"], histogram.counts):
+                cumulative += count
+                lines.append(f'tracker_storage_latency_seconds_bucket{{method="{method}",le="{bound}"}} {cumulative}')
+            lines.append(f'tracker_storage_latency_seconds_sum{{method="{method}"}} {histogram.sum}')
+            lines.append(f'tracker_storage_latency_seconds_count{{method="{method}"}} {histogram.count}')
+        lines.append("# TYPE tracker_storage_documents_total counter")
+        for operation, counts in sorted(self.documents.items()):
+            for kind in ("reads", "writes", "deletes"):
+                lines.append(f'tracker_storage_documents_total{{operation="{operation}",kind="{kind[:-1]}"}} {counts[kind]}')
+        lines.append("# TYPE tracker_storage_bytes_total counter")
+        for operation, counts in sorted(self.documents.items()):
+            for direction in ("read", "write"):
+                lines.append(f'tracker_storage_bytes_total{{operation="{operation}",direction="{direction}"}} '
+                             f'{counts[f"{direction}_bytes"]}')
+        return "\n".join(lines) + "\n"
+
+    def export(self, path):
+        with open(path, "w") as file:
+            if path.endswith(".prom"):
+                file.write(self.to_prometheus())
+            else:
+                json.dump(self.to_dict(), file, indent=2)
+
+    def print_report(self):
+        print("\nStorage calls:")
+        print(f"{'method':<34} {'calls':>7} {'total ms':>10} {'p50 ms':>8} {'p95 ms':>8}")
+        for method, histogram in sorted(self.latency.items(), key=lambda item: -item[1].sum):
+            print(f"{method:<34} {histogram.count:>7} {histogram.sum * 1000:>10.1f} "
+                  f"{histogram.quantile(0.5) * 1000:>8.1f} {histogram.quantile(0.95) * 1000:>8.1f}")
+        print("\nDocuments by operation:")
+        print(f"{'operation':<34} {'reads':>7} {'writes':>7} {'deletes':>7} {'KB in':>8} {'KB out':>8}")
+        for operation, counts in sorted(self.documents.items(), key=lambda item: -item[1]["reads"]):
+            print(f"{operation:<34} {counts['reads']:>7} {counts['writes']:>7} {counts['deletes']:>7} "
+                  f"{counts['read_bytes'] / 1024:>8.1f} {counts['write_bytes'] / 1024:>8.1f}")
+
+
+METRICS = Metrics()
+
+
+class MeteredStorage(Storage):
+    def __init__(self, storage, metrics=None):
+        self.storage = storage
+        self.metrics = metrics or METRICS
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    def _call(self, method, function, *args):
+        operation = caller()
+        start = time.perf_counter()
+        try:
+            result = function(*args)
+        finally:
+            self.metrics.observe(method, time.perf_counter() - start)
+        return operation, result
+
+    def _read(self, method, function, *args):
+        operation, result = self._call(method, function, *args)
+        if isinstance(result, dict) and method in ("get_tasks", "get_sessions_many", "get_rollups_many"):
+            documents = [data for value in result.values()
+                         for data in (value if isinstance(value, list) else [value])]
+        elif isinstance(result, list):
+            documents = result
+        else:
+            documents = [result]
+        documents = [data[1] if isinstance(data, tuple) else data for data in documents]
+        self.metrics.count(operation, reads=max(len(documents), 1),
+                           read_bytes=sum(payload_size(data) for data in documents))
+        return result
+
+    def _iter(self, method, function, fields, page_size):
+        operation = caller()
+        start = time.perf_counter()
+        reads = read_bytes = 0
+        try:
+            for name, data in function(fields, page_size):
+                reads += 1
+                read_bytes += payload_size(data)
+                yield name, data
+        finally:
+            self.metrics.observe(method, time.perf_counter() - start)
+            self.metrics.count(operation, reads=max(reads, 1), read_bytes=read_bytes)
+
+    def _delete(self, method, function, *args):
+        operation, result = self._call(method, function, *args)
+        self.metrics.count(operation, deletes=result if isinstance(result, int) and not isinstance(result, bool)
+                           else int(bool(result)))
+        return result
+
+    def commit(self, writes, progress=None):
+        operation, result = self._call("commit", self.storage.commit, writes, progress)
+        deletes = sum(1 for write in writes if write.kind == "delete")
+        self.metrics.count(operation, writes=len(writes) - deletes, deletes=deletes,
+                           write_bytes=sum(payload_size(write.data) for write in writes))
+        return result
+
+    def transact_task(self, name, build):
+        attempts = []
+
+        def capture(data):
+            writes, result = build(data)
+            attempts.append((data, writes or []))
+            return writes, result
+
+        operation, result = self._call("transact_task", self.storage.transact_task, name, capture)
+        for data, _ in attempts:
+            self.metrics.count(operation, reads=1, read_bytes=payload_size(data))
+        writes = attempts[-1][1] if attempts else []
+        deletes = sum(1 for write in writes if write.kind == "delete")
+        self.metrics.count(operation, writes=len(writes) - deletes, deletes=deletes,
+                           write_bytes=sum(payload_size(write.data) for write in writes))
+        return result
+
+    def get_task(self, name):
+        return self._read("get_task", self.storage.get_task, name)
+
+    def get_tasks(self, names):
+        return self._read("get_tasks", self.storage.get_tasks, list(names))
+
+    def delete_task(self, name):
+        return self._delete("delete_task", self.storage.delete_task, name)
+
+    def delete_all_tasks(self, progress=None):
+        return self._delete("delete_all_tasks", self.storage.delete_all_tasks, progress)
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("iter_tasks", self.storage.iter_tasks, fields, page_size)
+
+    def list_tasks(self, fields=None):
+        return self._read("list_tasks", self.storage.list_tasks, fields)
+
+    def dirty_tasks(self, fields=None):
+        return self._read("dirty_tasks", self.storage.dirty_tasks, fields)
+
+    def task_names(self):
+        return self._read("task_names", self.storage.task_names)
+
+    def get_sessions(self, task, since=None):
+        return self._read("get_sessions", self.storage.get_sessions, task, since)
+
+    def get_sessions_many(self, tasks):
+        return self._read("get_sessions_many", self.storage.get_sessions_many, list(tasks))
+
+    def get_rollups(self, bucket):
+        return self._read("get_rollups", self.storage.get_rollups, bucket)
+
+    def get_rollups_many(self, keys):
+        return self._read("get_rollups_many", self.storage.get_rollups_many, list(keys))
+
+    def get_playlist(self, name):
+        return self._read("get_playlist", self.storage.get_playlist, name)
+
+    def delete_playlist(self, name):
+        return self._delete("delete_playlist", self.storage.delete_playlist, name)
+
+    def delete_all_playlists(self, progress=None):
+        return self._delete("delete_all_playlists", self.storage.delete_all_playlists, progress)
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("iter_playlists", self.storage.iter_playlists, fields, page_size)
+
+    def list_playlists(self, fields=None):
+        return self._read("list_playlists", self.storage.list_playlists, fields)
+
+    def playlist_names(self):
+        return self._read("playlist_names", self.storage.playlist_names)
+
+
+def _is_firestore(value):
+    return type(value).__module__.startswith("google.cloud.firestore")
+
+
+def _unwrap(value):
+    if isinstance(value, list):
+        return [_unwrap(item) for item in value]
+    return value._target if isinstance(value, MeteredClient) else value
+
+
+class MeteredClient:
+    READS = ("get", "stream", "get_all", "list_documents")
+    WRITES = ("set", "update", "create", "add")
+
+    def __init__(self, target, metrics=None):
+        self._target = target
+        self._metrics = metrics or METRICS
+
+    def __getattr__(self, name):
+        value = getattr(self._target, name)
+        if not callable(value):
+            return self._wrap(value)
+        local = type(self._target).__name__.endswith("Snapshot")
+        if name in self.READS and not local:
+            return self._reader(name, value)
+        if (name in self.WRITES or name == "delete") and not local:
+            return self._writer(name, value)
+        return self._call(name, value)
+
+    def __iter__(self):
+        return (self._wrap(item) for item in self._target)
+
+    def _wrap(self, value):
+        if isinstance(value, list):
+            return [self._wrap(item) for item in value]
+        if _is_firestore(value):
+            return MeteredClient(value, self._metrics)
+        return value
+
+    def _method(self, name):
+        return f"{type(self._target).__name__}.{name}"
+
+    def _call(self, name, function):
+        def call(*args, **kwargs):
+            start = time.perf_counter()
+            result = function(*[_unwrap(arg) for arg in args], **{key: _unwrap(arg) for key, arg in kwargs.items()})
+            if name == "commit":
+                self._metrics.observe(self._method(name), time.perf_counter() - start)
+            return self._wrap(result)
+
+        return call
+
+    def _reader(self, name, function):
+        def read(*args, **kwargs):
+            operation = caller()
+            start = time.perf_counter()
+            result = function(*[_unwrap(arg) for arg in args], **kwargs)
+            if hasattr(result, "__anext__"):
+                return self._async_stream(operation, name, start, result)
+            if hasattr(result, "__await__"):
+                return self._awaited(operation, name, start, result)
+            if isinstance(result, list) or not hasattr(result, "__next__"):
+                self._metrics.observe(self._method(name), time.perf_counter() - start)
+                self._count_reads(operation, result if isinstance(result, list) else [result])
+                return self._wrap(result)
+            return self._stream(operation, name, start, result)
+
+        return read
+
+    def _stream(self, operation, name, start, iterator):
+        items = []
+        try:
+            for item in iterator:
+                items.append(item)
+                yield self._wrap(item)
+        finally:
+            self._metrics.observe(self._method(name), time.perf_counter() - start)
+            self._count_reads(operation, items)
+
+    async def _async_stream(self, operation, name, start, iterator):
+        items = []
+        try:
+            async for item in iterator:
+                items.append(item)
+                yield self._wrap(item)
+        finally:
+            self._metrics.observe(self._method(name), time.perf_counter() - start)
+            self._count_reads(operation, items)
+
+    async def _awaited(self, operation, name, start, awaitable):
+        result = await awaitable
+        self._metrics.observe(self._method(name), time.perf_counter() - start)
+        self._count_reads(operation, result if isinstance(result, list) else [result])
+        return self._wrap(result)
+
+    def _count_reads(self, operation, items):
+        read_bytes = sum(payload_size(item.to_dict()) for item in items if hasattr(item, "to_dict"))
+        self._metrics.count(operation, reads=max(len(items), 1), read_bytes=read_bytes)
+
+    def _writer(self, name, function):
+        def write(*args, **kwargs):
+            operation = caller()
+            args = [_unwrap(arg) for arg in args]
+            start = time.perf_counter()
+            result = function(*args, **kwargs)
+            self._metrics.observe(self._method(name), time.perf_counter() - start)
+            if name == "delete":
+                self._metrics.count(operation, deletes=1)
+            else:
+                data = next((arg for arg in args if isinstance(arg, dict)), None)
+                self._metrics.count(operation, writes=1, write_bytes=payload_size(data))
+            return self._wrap(result)
+
+        return write
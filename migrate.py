@@ -0,0 +1,218 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+
+from importer import save_state
+from rollups import build_rollups
+from storage import PAGE_SIZE, TASK_FIELDS, Maximum, Write, commit_batches, new_task, stream_pages
+
+CHECKPOINT = "migration_state.json"
+WORKERS = 8
+
+
+def new_state():
+    return {"cursor": None, "documents": 0, "skipped": 0, "playlists": None, "totals": {}, "finished": False}
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return new_state()
+    with open(path) as file:
+        return json.load(file)
+
+
+def is_legacy(data):
+    return "highscore" in data and "Highscore" not in data
+
+
+def legacy_playlists(db):
+    playlists = {}
+    for snapshot in db.collection("playlists").stream():
+        data = snapshot.to_dict()
+        if "name" in data:
+            playlists[snapshot.id] = (data["name"], data.get("tasks") or [])
+    return playlists
+
+
+def source_names(playlists):
+    return {f"{name}_{task}": (name, task.strip()) for name, tasks in playlists.values() for task in tasks}
+
+
+def split_id(document_id, names):
+    if document_id in names:
+        return names[document_id]
+    playlist, _, task = document_id.partition("_")
+    return (playlist, task.strip()) if task.strip() else None
+
+
+def transform(snapshot, names):
+    data = snapshot.to_dict()
+    source = split_id(snapshot.id, names) if is_legacy(data) else None
+    if source is None:
+        return None
+    playlist, task_name = source
+
+    legacy = {}
+    for score in data.get("scores") or []:
+        legacy.setdefault(score["date"], []).append(score["score"])
+    sessions = [(f"{day}_legacy", {"date": day, "scores": scores}) for day, scores in legacy.items()]
+    sessions += [(session.id, session.to_dict()) for session in snapshot.reference.collection("sessions").stream()]
+
+    writes = []
+    count, total, best = 0, 0, None
+    for session_id, session in sessions:
+        scores = list(session.get("scores") or [])
+        if not scores or not session.get("date"):
+            continue
+        count += len(scores)
+        total += sum(scores)
+        best = max(scores) if best is None else max(best, *scores)
+        session_id = f"{session_id}@{playlist}"
+        writes.append(Write("set", "sessions", (task_name, session_id), {
+            "Date": session["date"],
+            "Session": session_id,
+            "Scores": scores,
+            "Sensitivity": session.get("sensitivity"),
+            "Repetitions": len(scores),
+        }))
+
+    fields = {"Tasks": task_name, "Dirty": True}
+    highscore = max(data.get("highscore") or 0, best or 0)
+    if highscore:
+        fields["Highscore"] = Maximum(highscore)
+    if data.get("threshold"):
+        fields["Threshold"] = Maximum(data["threshold"])
+    if data.get("sensitivity") is not None:
+        fields["Sensitivity"] = data["sensitivity"]
+    if data.get("update"):
+        fields["Date"] = data["update"]
+    writes.append(Write("merge", "tasks", task_name, fields))
+    return playlist, task_name, writes, (count, total, best)
+
+
+def migrate_playlists(storage, playlists):
+    merged = {}
+    for name, tasks in playlists.values():
+        members = merged.setdefault(name.strip(), [])
+        members += [task.strip() for task in tasks if task.strip() and task.strip() not in members]
+    storage.commit([Write("set", "playlists", name, {"playlist_name": name, "tasks": tasks})
+                    for name, tasks in merged.items()])
+    return len(merged)
+
+
+def fill_defaults(storage, results):
+    existing = storage.get_tasks(sorted({task_name for _, task_name, _, _ in results}))
+    filled = set()
+    for _, task_name, writes, _ in results:
+        if task_name in filled:
+            continue
+        filled.add(task_name)
+        current = existing.get(task_name) or {}
+        task_write = writes[-1]
+        highscore = task_write.data.get("Highscore")
+        defaults = {field: value for field, value in new_task(task_name, highscore and highscore.value).items()
+                    if field not in current and field not in task_write.data}
+        writes[-1] = task_write._replace(data=dict(defaults, **task_write.data))
+
+
+def migrate_page(storage, executor, page, names, state):
+    results = [result for result in executor.map(lambda snapshot: transform(snapshot, names), page) if result]
+    if results:
+        fill_defaults(storage, results)
+    writes = [write for _, _, task_writes, _ in results for write in task_writes]
+    if writes:
+        storage.commit(writes)
+
+    for playlist, task_name, _, (count, total, best) in results:
+        totals = state["totals"].setdefault(task_name, {"count": 0, "sum": 0, "best": None, "playlists": []})
+        totals["count"] += count
+        totals["sum"] += total
+        if best is not None:
+            totals["best"] = best if totals["best"] is None else max(totals["best"], best)
+        if playlist not in totals["playlists"]:
+            totals["playlists"].append(playlist)
+    state["documents"] += len(results)
+    state["skipped"] += len(page) - len(results)
+    state["cursor"] = page[-1].id
+
+
+def verify(storage, state, page_size=PAGE_SIZE):
+    names = sorted(state["totals"])
+    mismatches = []
+    writes = []
+    reps = 0
+    for start in range(0, len(names), page_size):
+        chunk = names[start:start + page_size]
+        tasks = storage.get_tasks(chunk)
+        all_sessions = storage.get_sessions_many(chunk)
+        for task_name in chunk:
+            expected = state["totals"][task_name]
+            suffixes = tuple(f"@{playlist}" for playlist in expected["playlists"])
+            sessions = list(all_sessions.get(task_name) or [])
+            migrated = [session for session_id, session in sessions if session_id.endswith(suffixes)]
+            count = sum(len(session.get("Scores", [])) for session in migrated)
+            total = sum(sum(session.get("Scores", [])) for session in migrated)
+            task_data = tasks.get(task_name)
+            if (task_data is None or any(field not in task_data for field in TASK_FIELDS) or count != expected["count"] or abs(total - expected["sum"]) > 1e-6
+                    or (expected["best"] is not None and (task_data.get("Highscore") or 0) < expected["best"])):
+                mismatches.append(task_name)
+            reps += count
+            writes += build_rollups(task_name, sessions, (task_data or {}).get("Threshold"))
+    if writes:
+        storage.commit(writes)
+    return {"tasks": len(names), "reps": reps, "rollups": len(writes), "mismatches": mismatches}
+
+
+def delete_source(db, page_size=PAGE_SIZE):
+    deleted = 0
+    playlists = legacy_playlists(db)
+    names = source_names(playlists)
+    ops = []
+    for seen, snapshot in enumerate(stream_pages(db.collection("tasks"), page_size), 1):
+        if is_legacy(snapshot.to_dict()) and split_id(snapshot.id, names):
+            ops += [("delete", ref, None) for ref in snapshot.reference.collection("sessions").list_documents()]
+            ops.append(("delete", snapshot.reference, None))
+            deleted += 1
+        if seen % page_size == 0 and ops:
+            commit_batches(db, ops)
+            ops = []
+    ops += [("delete", db.collection("playlists").document(playlist_id), None) for playlist_id in playlists]
+    commit_batches(db, ops)
+    return deleted
+
+
+def migrate(tracker, db, checkpoint_path=CHECKPOINT, page_size=PAGE_SIZE, workers=WORKERS, restart=False,
+            progress=None):
+    state = new_state() if restart else load_checkpoint(checkpoint_path)
+    if state["finished"]:
+        return state
+
+    playlists = legacy_playlists(db)
+    names = source_names(playlists)
+    if state["playlists"] is None:
+        state["playlists"] = migrate_playlists(tracker.storage, playlists)
+        save_state(checkpoint_path, state)
+
+    query = db.collection("tasks")
+    cursor = query.document(state["cursor"]).get() if state["cursor"] else None
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        page = []
+        for snapshot in stream_pages(query, page_size, cursor=cursor):
+            page.append(snapshot)
+            if len(page) == page_size:
+                migrate_page(tracker.storage, executor, page, names, state)
+                save_state(checkpoint_path, state)
+                page = []
+                if progress:
+                    progress(state["documents"])
+        if page:
+            migrate_page(tracker.storage, executor, page, names, state)
+            save_state(checkpoint_path, state)
+            if progress:
+                progress(state["documents"])
+
+    tracker.refresh()
+    state["verified"] = verify(tracker.storage, state, page_size)
+    state["finished"] = not state["verified"]["mismatches"]
+    save_state(checkpoint_path, state)
+    return state
@@ -2,15 +2,33 @@ import pandas as pd
 import firebase_admin
 from firebase_admin import credentials, firestore
 from google.cloud.firestore import ArrayUnion
-from datetime import datetime, timedelta
+from datetime import datetime
 import os
 import platform
 import warnings
+import async_fetch
+from aggregates import RunningAggregate
+from analytics import ScoreTable
+from storage import commit_batches, content_hash
 
 
 cred = credentials.Certificate("cred.json")
 firebase_admin.initialize_app(cred)
 db = firestore.client()
+async_client = async_fetch.async_client
+if os.environ.get("TRACKER_PROFILE"):
+    import atexit
+    import metrics
+
+    db = metrics.MeteredClient(db)
+
+    def async_client():
+        return metrics.MeteredClient(async_fetch.async_client())
+
+    commit_batches = metrics.attributed(commit_batches)
+    atexit.register(metrics.METRICS.print_report)
+    if os.environ.get("TRACKER_METRICS_OUT"):
+        atexit.register(metrics.METRICS.export, os.environ["TRACKER_METRICS_OUT"])
 
 def clear_console():
     system = platform.system()
@@ -20,6 +38,47 @@ def clear_console():
         os.system('clear')
 
 
+def print_progress(done, total):
+    print(f"\r{done}/{total} documents written", end="\n" if done == total else "", flush=True)
+
+
+def get_scores(task_ref, task_data):
+    scores = list(task_data.get("scores", []))
+    for session in task_ref.collection("sessions").stream():
+        session_data = session.to_dict()
+        scores += [{"score": score, "date": session_data["date"]} for score in session_data.get("scores", [])]
+    return scores
+
+
+def load_score_table(tasks):
+    records = [(task.id, score["date"], score["score"])
+               for task in tasks for score in task.to_dict().get("scores", [])]
+    for session in db.collection_group("sessions").stream():
+        session_data = session.to_dict()
+        if "date" not in session_data:
+            continue
+        task_id = session.reference.parent.parent.id
+        records += [(task_id, session_data["date"], score) for score in session_data.get("scores", [])]
+    return ScoreTable.from_records(records)
+
+
+def load_stats(task_ref, task_data):
+    if "stats" in task_data:
+        return RunningAggregate.from_dict(task_data["stats"])
+    stats = RunningAggregate()
+    for score in get_scores(task_ref, task_data):
+        stats.add([score["score"]], score["date"])
+    return stats
+
+
+def legacy_session_ops(task_ref, legacy_scores):
+    sessions = {}
+    for score in legacy_scores:
+        sessions.setdefault(score["date"], []).append(score["score"])
+    return [("set", task_ref.collection("sessions").document(f"{date}_legacy"), {"date": date, "scores": scores})
+            for date, scores in sessions.items()]
+
+
 class TrainingTracker:
     def __init__(self):
         self.current_playlist = None
@@ -156,9 +215,11 @@ class TrainingTracker:
                 "Repetitions"
             ))
 
-            for task_name in self.current_playlist['tasks']:
-                task_ref = db.collection("tasks").document(f"{playlist_name}_{task_name}")
-                task_data = task_ref.get().to_dict()
+            task_paths = {task_name: f"tasks/{playlist_name}_{task_name}" for task_name in self.current_playlist['tasks']}
+            documents = async_fetch.get_documents(async_client(), list(task_paths.values()))
+
+            for task_name, task_path in task_paths.items():
+                task_data = documents[task_path]
                 if task_data:
                     task_id = f"{playlist_name}_{task_name}"
                     highscore = task_data.get('highscore', 'N/A')
@@ -167,7 +228,7 @@ class TrainingTracker:
                     avg_last_10 = task_data.get('avg_last_10', 'N/A')
                     threshold = task_data.get('threshold', 'N/A')
                     sensitivity = task_data.get('sensitivity', 'N/A')
-                    repetitions = len(task_data.get('scores', []))
+                    repetitions = task_data.get('repetitions', len(task_data.get('scores', [])))
 
                     print("{:<20} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15}".format(
                         task_id, highscore, old_highscore, new_highscore, avg_last_10, threshold, sensitivity,
@@ -195,7 +256,7 @@ class TrainingTracker:
             avg_last_10 = task_data.get('avg_last_10', 'N/A')
             threshold = task_data.get('threshold', 'N/A')
             sensitivity = task_data.get('sensitivity', 'N/A')
-            repetitions = len(task_data.get('scores', []))
+            repetitions = task_data.get('repetitions', len(task_data.get('scores', [])))
 
             print("{:<20} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15}".format(
                 task_id, highscore, old_highscore, new_highscore, avg_last_10, threshold, sensitivity, repetitions
@@ -248,16 +309,16 @@ class TrainingTracker:
 
             if task_data.exists:
                 task_data = task_data.to_dict()
-                current_scores = task_data.get("scores", [])
-                date_today = datetime.today().strftime('%Y-%m-%d')
+                legacy_scores = task_data.get("scores", [])
+                now = datetime.today()
+                date_today = now.strftime('%Y-%m-%d')
 
-                updated_scores = current_scores + [{"score": score, "date": date_today} for score in new_scores]
+                stats = load_stats(task_ref, task_data).add(new_scores, date_today)
 
-                highscore = max(updated_scores, key=lambda x: x['score'])['score']
+                highscore = stats.best
                 old_highscore = task_data.get("highscore", "N/A")
                 new_highscore = max(old_highscore, highscore)
-                last_10_scores = [score['score'] for score in updated_scores[-10:]]
-                avg_last_10 = round(sum(last_10_scores) / min(10, len(last_10_scores)), 2) if last_10_scores else 'N/A'
+                avg_last_10 = round(stats.recent_mean(), 2)
                 threshold = round(0.95 * highscore, 2)
                 highscore_beaten_today = any(score > new_highscore for score in new_scores)
                 threshold_achieved_today = new_highscore >= threshold
@@ -269,13 +330,20 @@ class TrainingTracker:
                     "new_highscore": highscore,
                     "avg_last_10": avg_last_10,
                     "threshold": threshold,
-                    "scores": updated_scores,
+                    "stats": stats.to_dict(),
+                    "repetitions": stats.count,
                     "threshold_achieved": threshold_achieved_today,
                     "highscore_beaten": highscore_beaten_today,
                     "update": date_today,
                 }
 
-                task_ref.set(task_data, merge=True)
+                session_ref = task_ref.collection("sessions").document(f"{date_today}_{now.strftime('%H%M%S%f')}")
+                ops = [("set", session_ref, {"date": date_today, "scores": new_scores, "sensitivity": sensitivity})]
+                if legacy_scores:
+                    ops += legacy_session_ops(task_ref, legacy_scores)
+                    task_data["scores"] = firestore.DELETE_FIELD
+                ops.append(("merge", task_ref, task_data))
+                commit_batches(db, ops)
             else:
                 print(f"No data found for task: {task_name}")
         else:
@@ -283,28 +351,32 @@ class TrainingTracker:
 
     def refresh(self):
         tasks = db.collection("tasks").get()
+        ops = []
 
         for task in tasks:
             task_data = task.to_dict()
-            current_scores = task_data.get("scores", [])
+            stats = load_stats(task.reference, task_data)
 
-            if current_scores:
-                last_10_scores = [score['score'] for score in current_scores[-10:]]
-                avg_last_10 = round(sum(last_10_scores) / min(10, len(last_10_scores)), 2) if last_10_scores else 'N/A'
-                highscore = max(current_scores, key=lambda x: x['score'])['score']
+            if stats.count:
+                avg_last_10 = round(stats.recent_mean(), 2)
+                highscore = stats.best
                 threshold = round(0.95 * highscore, 2)
 
-                task_ref = db.collection("tasks").document(task.id)
-                task_ref.set({"avg_last_10": avg_last_10, "highscore": highscore, "threshold": threshold}, merge=True)
+                fields = {"avg_last_10": avg_last_10, "highscore": highscore, "threshold": threshold,
+                          "stats": stats.to_dict()}
+                if content_hash(fields) != content_hash({key: task_data.get(key) for key in fields}):
+                    ops.append(("merge", task.reference, fields))
 
+        commit_batches(db, ops, progress=print_progress)
         print("Data refreshed successfully.")
 
     def delete_all_tasks(self):
         confirmation = input("Are you sure you want to delete all tasks? (y/n): ")
         if confirmation.lower() == 'y':
-            tasks = db.collection("tasks").get()
-            for task in tasks:
-                task.reference.delete()
+            ops = [("delete", session.reference, None)
+                   for session in db.collection_group("sessions").select([]).stream()]
+            ops += [("delete", ref, None) for ref in db.collection("tasks").list_documents()]
+            commit_batches(db, ops, progress=print_progress)
             print("All tasks deleted successfully.")
         else:
             print("Task deletion aborted.")
@@ -316,7 +388,8 @@ class TrainingTracker:
             task_ref = db.collection("tasks").document(f"{playlist_name}_{task_name}")
             task_data = task_ref.get()
             if task_data.exists:
-                task_ref.delete()
+                ops = [("delete", ref, None) for ref in task_ref.collection("sessions").list_documents()]
+                commit_batches(db, ops + [("delete", task_ref, None)])
                 print(f"Task '{task_name}' deleted successfully.")
             else:
                 print(f"No data found for task: {task_name}")
@@ -335,73 +408,30 @@ class TrainingTracker:
             "Threshold", "Sensitivity", "Repetitions"
         ))
 
-        today = datetime.today()
+        period_stats = load_score_table(all_tasks).period_stats(periods=(time_period,))
 
         for task in all_tasks:
             task_data = task.to_dict()
             task_id = task.id
-            avg_today = self.calculate_avg_for_period(task_data.get('scores', []), time_period)
-
-            if avg_today != 'N/A':
-                relevant_scores = [score for score in task_data.get('scores', [])
-                                   if datetime.strptime(score['date'], '%Y-%m-%d') >= self.get_start_date(today,
-                                                                                                          time_period)]
-
-                if relevant_scores:
-                    old_highscore = task_data.get('old_highscore', 'N/A')
-                    new_highscore = task_data.get('new_highscore', 'N/A')
-                    avg_last_10 = task_data.get('avg_last_10', 'N/A')
-                    threshold_achieved = task_data.get('threshold_achieved', 'N/A')
-                    sensitivity = task_data.get('sensitivity', 'N/A')
-                    repetitions = len(relevant_scores)
-                    date_today = task_data.get('update', 'N/A')
-
-                    print("{:<20} {:<20} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15}".format(
-                        date_today, task_id, old_highscore, new_highscore, avg_last_10, avg_today, threshold_achieved,
-                        sensitivity,
-                        repetitions
-                    ))
-                else:
-                    print(f"No data available for task: {task_id}")
+            repetitions = int(period_stats[f"count_{time_period}"].get(task_id, 0))
+
+            if repetitions:
+                avg_period = period_stats.at[task_id, f"avg_{time_period}"]
+                old_highscore = task_data.get('old_highscore', 'N/A')
+                new_highscore = task_data.get('new_highscore', 'N/A')
+                avg_last_10 = task_data.get('avg_last_10', 'N/A')
+                threshold_achieved = task_data.get('threshold_achieved', 'N/A')
+                sensitivity = task_data.get('sensitivity', 'N/A')
+                date_today = task_data.get('update', 'N/A')
+
+                print("{:<20} {:<20} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15} {:<15}".format(
+                    date_today, task_id, old_highscore, new_highscore, avg_last_10, avg_period, threshold_achieved,
+                    sensitivity,
+                    repetitions
+                ))
             else:
                 print(f"No data available for task: {task_id}")
 
-    def get_start_date(self, today, time_period):
-        if time_period == 'day':
-            return today
-        elif time_period == 'week':
-            return today - timedelta(days=today.weekday())
-        elif time_period == 'month':
-            return today.replace(day=1)
-        elif time_period == 'year':
-            return today.replace(month=1, day=1)
-        else:
-            return today
-
-    def calculate_avg_for_period(self, scores, time_period):
-        today = datetime.today()
-
-        if time_period == 'day':
-            start_date = today.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif time_period == 'week':
-            start_date = today - timedelta(days=today.weekday())
-            start_date = start_date.replace(hour=0, minute=0, second=0, microsecond=0)
-        elif time_period == 'month':
-            start_date = today.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
-        elif time_period == 'year':
-            start_date = today.replace(month=1, day=1, hour=0, minute=0, second=0, microsecond=0)
-        else:
-            return 'N/A'
-
-        relevant_scores = [
-            score['score']
-            for score in scores
-            if datetime.strptime(score['date'], '%Y-%m-%d') >= start_date
-        ]
-
-        return round(sum(relevant_scores) / len(relevant_scores), 2) if relevant_scores else 'N/A'
-
-
 if __name__ == "__main__":
     tracker = Tracker()
 
@@ -0,0 +1,428 @@
+import json
+import sqlite3
+import threading
+import time
+
+from metrics import caller, operation
+from storage import BATCH_LIMIT, DELETE_FIELD, PAGE_SIZE, Increment, Maximum, Storage, Write, apply_fields, project
+
+OUTBOX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT,
+    operation TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_document ON outbox (collection, key);
+CREATE TABLE IF NOT EXISTS outbox_failed (
+    seq INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    collection TEXT NOT NULL,
+    key TEXT NOT NULL,
+    data TEXT,
+    operation TEXT,
+    error TEXT,
+    failed_at REAL
+);
+"""
+
+CALLS = ("delete_task", "delete_all_tasks", "delete_playlist", "delete_all_playlists")
+PERMANENT_ERRORS = ("NotFound", "InvalidArgument", "FailedPrecondition")
+
+
+def is_permanent(error):
+    return isinstance(error, (KeyError, ValueError, TypeError)) or type(error).__name__ in PERMANENT_ERRORS
+
+
+def encode(data):
+    if data is None:
+        return None
+    fields = {}
+    for key, value in data.items():
+        if value is DELETE_FIELD:
+            value = {"$op": "delete"}
+        elif isinstance(value, Increment):
+            value = {"$op": "increment", "value": value.value}
+        elif isinstance(value, Maximum):
+            value = {"$op": "maximum", "value": value.value}
+        fields[key] = value
+    return json.dumps(fields)
+
+
+def decode(text):
+    if text is None:
+        return None
+    fields = {}
+    for key, value in json.loads(text).items():
+        if isinstance(value, dict) and value.get("$op") == "delete":
+            value = DELETE_FIELD
+        elif isinstance(value, dict) and value.get("$op") == "increment":
+            value = Increment(value["value"])
+        elif isinstance(value, dict) and value.get("$op") == "maximum":
+            value = Maximum(value["value"])
+        fields[key] = value
+    return fields
+
+
+def decode_key(text):
+    key = json.loads(text)
+    return tuple(key) if isinstance(key, list) else key
+
+
+def combine_fields(first, second):
+    combined = dict(first)
+    for key, value in second.items():
+        if key not in combined or not isinstance(value, (Increment, Maximum)):
+            combined[key] = value
+            continue
+        current = combined[key]
+        if current is DELETE_FIELD or current is None:
+            combined[key] = value.value
+        elif isinstance(current, (Increment, Maximum)):
+            if type(current) is not type(value):
+                return None
+            combined[key] = type(value)(current.value + value.value if isinstance(value, Increment)
+                                        else max(current.value, value.value))
+        elif isinstance(value, Increment):
+            combined[key] = current + value.value
+        else:
+            combined[key] = max(current, value.value)
+    return combined
+
+
+def coalesce(first, second):
+    if second.kind in ("set", "delete"):
+        return second
+    if first.kind == "delete":
+        return second._replace(kind="set", data=apply_fields({}, second.data)) if second.kind == "merge" else None
+    if first.kind == "set":
+        return first._replace(data=apply_fields(first.data, second.data))
+    fields = combine_fields(first.data, second.data)
+    if fields is None:
+        return None
+    return second._replace(kind="merge" if "merge" in (first.kind, second.kind) else "update", data=fields)
+
+
+class QueuedStorage(Storage):
+    def __init__(self, storage, path="outbox.db", retry_delay=1.0, max_delay=60.0, start=True):
+        self.storage = storage
+        self.path = path
+        self.retry_delay = retry_delay
+        self.max_delay = max_delay
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.executescript(OUTBOX_SCHEMA)
+        if "operation" not in [row[1] for row in self.conn.execute("PRAGMA table_info(outbox)")]:
+            self.conn.execute("ALTER TABLE outbox ADD COLUMN operation TEXT")
+        self.lock = threading.Lock()
+        self.replay_lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = threading.Event()
+        self.inflight = 0
+        self.isolating = 0
+        self.known = {}
+        self.error = None
+        self.thread = None
+        if start:
+            self.start()
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+    def start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, name="outbox", daemon=True)
+            self.thread.start()
+
+    def close(self, timeout=5.0):
+        remaining = self.flush(timeout)
+        self.stopping.set()
+        self.wakeup.set()
+        return remaining
+
+    def pending(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM outbox").fetchone()[0]
+
+    def _append(self, name, kind, collection, key, data=None):
+        key = json.dumps(key)
+        if kind not in CALLS:
+            barrier = self.conn.execute(
+                f"SELECT MAX(seq) FROM outbox WHERE kind IN ({', '.join('?' * len(CALLS))})", CALLS
+            ).fetchone()[0] or 0
+            row = self.conn.execute(
+                "SELECT seq, kind, data FROM outbox WHERE collection = ? AND key = ? AND seq > ? "
+                "ORDER BY seq DESC LIMIT 1",
+                (collection, key, max(barrier, self.inflight)),
+            ).fetchone()
+            if row:
+                combined = coalesce(Write(row[1], collection, None, decode(row[2])), Write(kind, collection, None, data))
+                if combined is not None:
+                    self.conn.execute("UPDATE outbox SET kind = ?, data = ? WHERE seq = ?",
+                                      (combined.kind, encode(combined.data), row[0]))
+                    return
+        self.conn.execute("INSERT INTO outbox (kind, collection, key, data, operation) VALUES (?, ?, ?, ?, ?)",
+                          (kind, collection, key, encode(data), name))
+
+    def _enqueue(self, entries):
+        name = caller()
+        with self.lock, self.conn:
+            for entry in entries:
+                self._append(name, *entry)
+        self.wakeup.set()
+
+    def commit(self, writes, progress=None):
+        self._enqueue([(write.kind, write.collection, write.key, write.data) for write in writes])
+        if progress:
+            progress(len(writes), len(writes))
+        return len(writes)
+
+    def _head(self):
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, kind, collection, key, data, operation FROM outbox ORDER BY seq LIMIT ?",
+                (BATCH_LIMIT,),
+            ).fetchall()
+            if not rows:
+                return rows
+            if rows[0][1] in CALLS or rows[0][0] <= self.isolating:
+                rows = rows[:1]
+            else:
+                rows = rows[:next((i for i, row in enumerate(rows) if row[1] in CALLS or row[5] != rows[0][5]),
+                                  len(rows))]
+            self.inflight = rows[-1][0]
+            return rows
+
+    def _send(self, rows):
+        _, kind, collection, key, data, name = rows[0]
+        with operation(name or "-"):
+            if kind in CALLS:
+                key = decode_key(key)
+                getattr(self.storage, kind)(*([] if key is None else [key]))
+            else:
+                self.storage.commit([Write(kind, collection, decode_key(key), decode(data))
+                                     for _, kind, collection, key, data, _ in rows])
+
+    def _remove(self, rows, error=None):
+        with self.lock, self.conn:
+            if error is not None:
+                self.conn.executemany(
+                    "INSERT OR REPLACE INTO outbox_failed (seq, kind, collection, key, data, operation, error, failed_at) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    [(*row, repr(error), time.time()) for row in rows],
+                )
+            else:
+                self._learn(rows)
+            self.conn.execute("DELETE FROM outbox WHERE seq <= ?", (rows[-1][0],))
+            self.inflight = 0
+        if error is not None:
+            _, kind, collection, key, _, _ = rows[0]
+            print(f"Warning: queued {kind} of {collection} {decode_key(key)} cannot be sent ({error}); "
+                  f"it was moved to the outbox_failed table in '{self.path}'.")
+
+    def _learn(self, rows):
+        for _, kind, collection, key, data, _ in rows:
+            key = decode_key(key)
+            if kind == "delete_all_tasks":
+                self.known.clear()
+            elif collection != "tasks" or kind in CALLS and kind != "delete_task":
+                continue
+            elif kind in ("delete", "delete_task"):
+                self.known[key] = None
+            elif kind == "set":
+                self.known[key] = apply_fields({}, decode(data))
+            elif self.known.get(key) is not None or kind == "merge" and key in self.known:
+                self.known[key] = apply_fields(self.known[key], decode(data))
+
+    def replay(self):
+        with self.replay_lock:
+            while True:
+                rows = self._head()
+                if not rows:
+                    return 0
+                try:
+                    self._send(rows)
+                except Exception as error:
+                    with self.lock:
+                        self.inflight = 0
+                    if not is_permanent(error):
+                        raise
+                    if len(rows) > 1:
+                        self.isolating = rows[-1][0]
+                        continue
+                    self._remove(rows, error)
+                    return 1
+                self._remove(rows)
+                return len(rows)
+
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        delay = self.retry_delay
+        while True:
+            try:
+                if not self.replay():
+                    return 0
+                delay = self.retry_delay
+            except Exception as error:
+                self.error = error
+                if deadline is not None and time.monotonic() + delay > deadline:
+                    return self.pending()
+                time.sleep(delay)
+                delay = min(delay * 2, self.max_delay)
+
+    def _run(self):
+        delay = self.retry_delay
+        while not self.stopping.is_set():
+            try:
+                replayed = self.replay()
+            except Exception as error:
+                self.error = error
+                self.stopping.wait(delay)
+                delay = min(delay * 2, self.max_delay)
+                continue
+            self.error = None
+            delay = self.retry_delay
+            if not replayed:
+                self.wakeup.wait()
+                self.wakeup.clear()
+
+    def _overlay(self, collection, documents, match):
+        with self.lock:
+            if self.conn.execute("SELECT 1 FROM outbox LIMIT 1").fetchone() is None:
+                return documents
+            related = ("tasks", collection) if collection in ("sessions", "rollups") else (collection,)
+            rows = self.conn.execute(
+                f"SELECT kind, collection, key, data FROM outbox WHERE collection IN ({', '.join('?' * len(related))}) "
+                "ORDER BY seq",
+                related,
+            ).fetchall()
+        for kind, row_collection, key, data in rows:
+            key = decode_key(key)
+            if kind in ("delete_all_tasks", "delete_all_playlists"):
+                if row_collection == collection or collection != "playlists" and kind == "delete_all_tasks":
+                    documents.clear()
+            elif kind in ("delete_task", "delete_playlist"):
+                for name in [name for name in documents if (name if row_collection == collection else name[0]) == key]:
+                    del documents[name]
+            elif row_collection != collection or not match(key):
+                continue
+            elif kind == "delete":
+                documents.pop(key, None)
+            elif kind == "set":
+                documents[key] = apply_fields({}, decode(data))
+            elif documents.get(key) is not None or kind == "merge":
+                documents[key] = apply_fields(documents.get(key), decode(data))
+        return documents
+
+    def _get(self, collection, names, loader):
+        names = set(names)
+        return self._overlay(collection, loader(), lambda key: key in names)
+
+    def _iter(self, collection, loader, fields, page_size):
+        if not self.pending():
+            yield from loader(fields, page_size)
+            return
+        documents = self._overlay(collection, dict(loader(None, page_size)), lambda key: True)
+        for name, data in sorted(documents.items()):
+            yield name, {} if fields == [] else project(data, fields)
+
+    def _remember(self, documents):
+        self.known.update(documents)
+        return dict(documents)
+
+    def transact_task(self, name, build):
+        try:
+            data = self.get_task(name)
+        except Exception as error:
+            if is_permanent(error):
+                raise
+            documents = self._overlay("tasks", {name: self.known[name]} if name in self.known else {},
+                                      lambda key: key == name)
+            if name not in documents:
+                raise
+            data = documents[name]
+        writes, result = build(data)
+        if writes:
+            self.commit(writes)
+        return result
+
+    def get_task(self, name):
+        return self._get("tasks", [name], lambda: self._remember({name: self.storage.get_task(name)})).get(name)
+
+    def get_tasks(self, names):
+        names = list(names)
+        documents = self._get("tasks", names, lambda: self._remember(self.storage.get_tasks(names)))
+        return {name: documents.get(name) for name in names}
+
+    def delete_task(self, name):
+        try:
+            exists = self.get_task(name) is not None
+        except Exception:
+            exists = True
+        if exists:
+            self._enqueue([("delete_task", "tasks", name)])
+        return exists
+
+    def delete_all_tasks(self, progress=None):
+        self._enqueue([("delete_all_tasks", "tasks", None)])
+        if progress:
+            progress(1, 1)
+        return 1
+
+    def _iter_tasks(self, fields, page_size):
+        for name, data in self.storage.iter_tasks(fields, page_size):
+            if fields is None:
+                self.known[name] = data
+            yield name, data
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("tasks", self._iter_tasks, fields, page_size)
+
+    def get_sessions(self, task, since=None):
+        documents = {(task, session_id): data for session_id, data in self.storage.get_sessions(task, since)}
+        documents = self._overlay("sessions", documents, lambda key: key[0] == task)
+        return sorted((session_id, data) for (_, session_id), data in documents.items()
+                      if not since or data.get("Date", "") >= since)
+
+    def get_sessions_many(self, tasks):
+        tasks = list(tasks)
+        documents = {(task, session_id): data for task, sessions in self.storage.get_sessions_many(tasks).items()
+                     for session_id, data in sessions}
+        documents = self._overlay("sessions", documents, lambda key: key[0] in tasks)
+        sessions = {task: [] for task in tasks}
+        for (task, session_id), data in sorted(documents.items()):
+            sessions[task].append((session_id, data))
+        return sessions
+
+    def get_rollups(self, bucket):
+        documents = {(task, bucket): data for task, data in self.storage.get_rollups(bucket)}
+        documents = self._overlay("rollups", documents, lambda key: key[1] == bucket)
+        return [(task, data) for (task, _), data in sorted(documents.items())]
+
+    def get_rollups_many(self, keys):
+        keys = [tuple(key) for key in keys]
+        documents = self._get("rollups", keys, lambda: self.storage.get_rollups_many(keys))
+        return {key: documents.get(key) for key in keys}
+
+    def get_playlist(self, name):
+        return self._get("playlists", [name], lambda: {name: self.storage.get_playlist(name)}).get(name)
+
+    def delete_playlist(self, name):
+        try:
+            exists = self.get_playlist(name) is not None
+        except Exception:
+            exists = True
+        if exists:
+            self._enqueue([("delete_playlist", "playlists", name)])
+        return exists
+
+    def delete_all_playlists(self, progress=None):
+        self._enqueue([("delete_all_playlists", "playlists", None)])
+        if progress:
+            progress(1, 1)
+        return 1
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("playlists", self.storage.iter_playlists, fields, page_size)
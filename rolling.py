@@ -0,0 +1,94 @@
+import warnings
+
+import numpy as np
+import pandas as pd
+
+WINDOW = 20
+SPAN = 10
+QUANTILES = (10, 50, 90)
+COLUMNS = ["reps", "ewma", "median", "p10", "p90", "std", "consistency"]
+
+
+def ewma_update(current, scores, alpha):
+    scores = np.asarray(scores, dtype=np.float64)
+    if not len(scores):
+        return current
+    if current is None:
+        current, scores = scores[0], scores[1:]
+    decay = (1 - alpha) ** np.arange(len(scores) - 1, -1, -1)
+    return float((1 - alpha) ** len(scores) * current + alpha * np.dot(decay, scores))
+
+
+class RollingSeries:
+    def __init__(self, scores=(), span=SPAN):
+        self.alpha = 2 / (span + 1)
+        self.buffer = np.empty(max(len(scores), 64))
+        self.size = 0
+        self.ewma = None
+        self.extend(scores)
+
+    @property
+    def scores(self):
+        return self.buffer[:self.size]
+
+    def extend(self, scores):
+        scores = np.asarray(scores, dtype=np.float64)
+        if self.size + len(scores) > len(self.buffer):
+            buffer = np.empty(max(len(self.buffer) * 2, self.size + len(scores)))
+            buffer[:self.size] = self.scores
+            self.buffer = buffer
+        self.buffer[self.size:self.size + len(scores)] = scores
+        self.size += len(scores)
+        self.ewma = ewma_update(self.ewma, scores, self.alpha)
+
+    def tail(self, window=WINDOW):
+        return self.buffer[max(self.size - window, 0):self.size]
+
+
+class RollingStats:
+    def __init__(self, window=WINDOW, span=SPAN):
+        self.window = window
+        self.span = span
+        self.series = {}
+        self.rows = {}
+        self.dirty = set()
+
+    @classmethod
+    def from_sessions(cls, sessions_by_task, window=WINDOW, span=SPAN):
+        stats = cls(window, span)
+        for task, sessions in sessions_by_task.items():
+            stats.extend(task, [score for _, session in sorted(sessions) for score in session.get("Scores", [])])
+        return stats
+
+    def extend(self, task, scores):
+        series = self.series.get(task)
+        if series is None:
+            self.series[task] = RollingSeries(scores, self.span)
+        else:
+            series.extend(scores)
+        self.dirty.add(task)
+
+    def _compute(self, tasks):
+        tails = np.full((len(tasks), self.window), np.nan)
+        for row, task in enumerate(tasks):
+            tail = self.series[task].tail(self.window)
+            if len(tail):
+                tails[row, -len(tail):] = tail
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            p10, median, p90 = np.nanpercentile(tails, QUANTILES, axis=1)
+            mean = np.nanmean(tails, axis=1)
+            std = np.nanstd(tails, axis=1)
+            consistency = np.clip(1 - std / mean, 0, 1)
+        for row, task in enumerate(tasks):
+            series = self.series[task]
+            self.rows[task] = (series.size, series.ewma, median[row], p10[row], p90[row], std[row], consistency[row])
+
+    def table(self, tasks=None):
+        tasks = sorted(self.series) if tasks is None else [task for task in tasks if task in self.series]
+        stale = [task for task in tasks if task in self.dirty or task not in self.rows]
+        if stale:
+            self._compute(stale)
+            self.dirty.difference_update(stale)
+        return pd.DataFrame([self.rows[task] for task in tasks], columns=COLUMNS,
+                            index=pd.Index(tasks, name="task")).round(2)
@@ -0,0 +1,60 @@
+from datetime import date
+
+from storage import Increment, Maximum, Write
+
+BUCKETS = ("day", "week", "month", "year")
+
+
+def bucket_keys(day):
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    iso_year, iso_week, _ = day.isocalendar()
+    return {
+        "day": day.isoformat(),
+        "week": f"{iso_year}-W{iso_week:02d}",
+        "month": f"{day.year}-{day.month:02d}",
+        "year": str(day.year),
+    }
+
+
+def threshold_hits(scores, threshold):
+    return sum(1 for score in scores if threshold and score >= threshold)
+
+
+def rollup_writes(task_name, day, scores, threshold):
+    hits = threshold_hits(scores, threshold)
+    writes = []
+    for period, bucket in bucket_keys(day).items():
+        writes.append(Write("merge", "rollups", (task_name, bucket), {
+            "Task": task_name,
+            "Bucket": bucket,
+            "Period": period,
+            "Count": Increment(len(scores)),
+            "Sum": Increment(sum(scores)),
+            "Max": Maximum(max(scores)),
+            "Threshold_Hits": Increment(hits),
+        }))
+    return writes
+
+
+def build_rollups(task_name, sessions, threshold):
+    rollups = {}
+    for _, session in sessions:
+        scores = session.get("Scores", [])
+        if not scores:
+            continue
+        for period, bucket in bucket_keys(session["Date"]).items():
+            rollup = rollups.setdefault(bucket, {
+                "Task": task_name,
+                "Bucket": bucket,
+                "Period": period,
+                "Count": 0,
+                "Sum": 0,
+                "Max": None,
+                "Threshold_Hits": 0,
+            })
+            rollup["Count"] += len(scores)
+            rollup["Sum"] += sum(scores)
+            rollup["Max"] = max(scores) if rollup["Max"] is None else max(rollup["Max"], *scores)
+            rollup["Threshold_Hits"] += threshold_hits(scores, session.get("Threshold", threshold))
+    return [Write("set", "rollups", (task_name, bucket), rollup) for bucket, rollup in rollups.items()]
@@ -0,0 +1,145 @@
+from datetime import date
+
+import numpy as np
+
+from aggregates import RunningAggregate
+
+COLUMNS = {
+    "Date": "datetime64[D]",
+    "Sensitivity": np.float64,
+    "Repetitions": np.int64,
+    "Old_Highscore": np.float64,
+    "Highscore": np.float64,
+    "Avg_Daily": np.float64,
+    "Avg_10": np.float64,
+    "Threshold": np.float64,
+    "Threshold_Achieved": np.float64,
+}
+FIELDS = ["Sensitivity", "Repetitions", "Old_Highscore", "Highscore", "Avg_Daily", "Avg_10", "Threshold",
+          "Threshold_Achieved"]
+
+
+def task_key(task_name):
+    return task_name.strip().lower()
+
+
+def day_key(day):
+    return day if isinstance(day, str) else day.isoformat()
+
+
+def missing(value):
+    return np.nan if value is None else value
+
+
+class SessionTable:
+    def __init__(self, capacity=64):
+        self.columns = {name: np.empty(capacity, dtype=dtype) for name, dtype in COLUMNS.items()}
+        self.tasks = np.empty(capacity, dtype=object)
+        self.scores = np.empty(capacity, dtype=object)
+        self.size = 0
+        self.index = {}
+        self.by_task = {}
+        self.stats = {}
+        self.highscores = {}
+        self.loaded = set()
+
+    def _grow(self):
+        capacity = len(self.tasks) * 2
+        for name, column in self.columns.items():
+            grown = np.empty(capacity, dtype=column.dtype)
+            grown[:self.size] = column[:self.size]
+            self.columns[name] = grown
+        for name in ("tasks", "scores"):
+            grown = np.empty(capacity, dtype=object)
+            grown[:self.size] = getattr(self, name)[:self.size]
+            setattr(self, name, grown)
+
+    def _row(self, task_name, day):
+        key = (task_key(task_name), day_key(day))
+        row = self.index.get(key)
+        if row is None:
+            if self.size == len(self.tasks):
+                self._grow()
+            row = self.size
+            self.size += 1
+            self.index[key] = row
+            self.by_task.setdefault(key[0], {})[key[1]] = row
+            self.tasks[row] = task_name
+            self.scores[row] = []
+            self.columns["Date"][row] = np.datetime64(key[1], "D")
+            for name in FIELDS:
+                self.columns[name][row] = 0 if name == "Repetitions" else np.nan
+        return key, row
+
+    def upsert(self, task_name, day, scores=(), **fields):
+        _, row = self._row(task_name, day)
+        self.scores[row] = self.scores[row] + [float(score) for score in scores]
+        for name, value in fields.items():
+            self.columns[name][row] = missing(value)
+        return row
+
+    def get(self, task_name, day):
+        row = self.index.get((task_key(task_name), day_key(day)))
+        if row is None:
+            return None
+        return self._record(row)
+
+    def _record(self, row):
+        record = {"Date": str(self.columns["Date"][row]), "Tasks": self.tasks[row], "Scores": list(self.scores[row])}
+        for name in FIELDS:
+            value = self.columns[name][row].item()
+            record[name] = None if value != value else value
+        if record["Threshold_Achieved"] is not None:
+            record["Threshold_Achieved"] = bool(record["Threshold_Achieved"])
+        return record
+
+    def days(self, task_name):
+        rows = self.by_task.get(task_key(task_name), {})
+        return [self._record(rows[day]) for day in sorted(rows)]
+
+    def has_task(self, task_name):
+        return task_key(task_name) in self.loaded
+
+    def load(self, storage, tasks):
+        tasks = [task_name for task_name in dict.fromkeys(tasks) if not self.has_task(task_name)]
+        if not tasks:
+            return self
+        tasks = storage.get_tasks(tasks)
+        all_sessions = storage.get_sessions_many([name for name, data in tasks.items() if data])
+        for task_name, sessions in all_sessions.items():
+            sessions = list(sessions)
+            legacy = tasks[task_name].get("Scores")
+            if legacy:
+                legacy_date = tasks[task_name].get("Date") or date.today().isoformat()
+                sessions.append((f"{legacy_date}_legacy", {"Date": legacy_date, "Scores": legacy}))
+            sessions = [session for _, session in sorted(sessions, key=lambda item: (item[1].get("Date") or "", item[0]))
+                        if session.get("Date") and session.get("Scores")]
+            best = max((max(session["Scores"]) for session in sessions), default=0)
+            highscore = tasks[task_name].get("Highscore") or 0
+            if highscore > best:
+                self.highscores[task_key(task_name)] = highscore
+            for session in sessions:
+                self.record(task_name, session["Date"], session["Scores"], session.get("Sensitivity"),
+                            session.get("Threshold"))
+        self.loaded.update(task_key(task_name) for task_name in tasks)
+        return self
+
+    def record(self, task_name, day, scores, sensitivity=None, threshold=None):
+        key = task_key(task_name)
+        stats = self.stats.setdefault(key, RunningAggregate())
+        stats.add(scores, day_key(day))
+        old_highscore = self.highscores.get(key, 0)
+        highscore = self.highscores[key] = max(max(scores), old_highscore)
+        if threshold is None:
+            threshold = round(0.9 * (old_highscore or highscore), 2)
+        _, row = self._row(task_name, day)
+        day_scores = self.scores[row] + [float(score) for score in scores]
+        return self.upsert(task_name, day, scores,
+                           Sensitivity=sensitivity,
+                           Repetitions=len(day_scores),
+                           Old_Highscore=old_highscore,
+                           Highscore=highscore,
+                           Avg_Daily=sum(day_scores) / len(day_scores),
+                           Avg_10=stats.recent_mean(),
+                           Threshold=threshold,
+                           Threshold_Achieved=max(scores) >= threshold)
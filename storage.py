@@ -0,0 +1,703 @@
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from timing import timed
+
+BATCH_LIMIT = 500
+PAGE_SIZE = 300
+
+Write = namedtuple("Write", ["kind", "collection", "key", "data"], defaults=[None])
+
+
+class _DeleteField:
+    def __repr__(self):
+        return "DELETE_FIELD"
+
+
+DELETE_FIELD = _DeleteField()
+
+Increment = namedtuple("Increment", ["value"])
+Maximum = namedtuple("Maximum", ["value"])
+
+
+def apply_fields(data, fields):
+    data = dict(data or {})
+    for key, value in fields.items():
+        if value is DELETE_FIELD:
+            data.pop(key, None)
+        elif isinstance(value, Increment):
+            data[key] = (data.get(key) or 0) + value.value
+        elif isinstance(value, Maximum):
+            current = data.get(key)
+            data[key] = value.value if current is None else max(current, value.value)
+        else:
+            data[key] = value
+    return data
+
+
+def has_transforms(ops):
+    from google.cloud.firestore_v1 import transforms
+
+    return any(isinstance(value, (transforms.Increment, transforms.Maximum))
+               for _, _, data in ops if data for value in data.values())
+
+
+def commit_batches(db, ops, progress=None, workers=8, retries=3):
+    chunks = [ops[i:i + BATCH_LIMIT] for i in range(0, len(ops), BATCH_LIMIT)]
+    paths = [ref.path for _, ref, _ in ops]
+    ordered = len(chunks) > 1 and (len(set(paths)) < len(paths) or has_transforms(ops))
+
+    def commit(chunk):
+        attempts = 1 if has_transforms(chunk) else retries + 1
+        for attempt in range(attempts):
+            batch = db.batch()
+            for kind, ref, data in chunk:
+                if kind == "set":
+                    batch.set(ref, data)
+                elif kind == "merge":
+                    batch.set(ref, data, merge=True)
+                elif kind == "update":
+                    batch.update(ref, data)
+                elif kind == "delete":
+                    batch.delete(ref)
+                else:
+                    raise ValueError(f"Unknown write kind '{kind}'.")
+            try:
+                batch.commit()
+                return len(chunk)
+            except Exception:
+                if attempt == attempts - 1:
+                    raise
+                time.sleep(0.5 * 2 ** attempt)
+
+    done = 0
+    if ordered:
+        for chunk in chunks:
+            done += commit(chunk)
+            if progress:
+                progress(done, len(ops))
+        return done
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(contextvars.copy_context().run, commit, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            done += future.result()
+            if progress:
+                progress(done, len(ops))
+    return done
+
+
+def stream_pages(query, page_size=PAGE_SIZE, order_by=None, cursor=None):
+    if order_by:
+        query = query.order_by(order_by)
+    query = query.order_by("__name__").limit(page_size)
+    while True:
+        page = list((query if cursor is None else query.start_after(cursor)).stream())
+        yield from page
+        if len(page) < page_size:
+            return
+        cursor = page[-1]
+
+
+def stamp(writes, now=None):
+    now = time.time() if now is None else now
+    return [write if write.kind == "delete" or "Updated" in write.data
+            else write._replace(data={**write.data, "Updated": now}) for write in writes]
+
+
+TASK_FIELDS = ["Date", "Tasks", "Sensitivity", "Repetitions", "Old_Highscore", "Highscore", "Avg_Daily", "Avg_10",
+               "Threshold", "Threshold_Achieved"]
+
+
+def new_task(task_name, highscore=None):
+    return {
+        "Date": "",
+        "Tasks": task_name,
+        "Sensitivity": None,
+        "Repetitions": 0,
+        "Old_Highscore": None,
+        "Highscore": highscore,
+        "Avg_Daily": None,
+        "Avg_10": None,
+        "Threshold": round(0.9 * highscore, 2) if highscore else None,
+        "Threshold_Achieved": None
+    }
+
+
+def content_hash(data):
+    return hashlib.sha1(json.dumps(data, sort_keys=True, default=str).encode()).hexdigest()
+
+
+def project(data, fields):
+    if fields is None:
+        return data
+    return {field: data[field] for field in fields if field in data}
+
+
+class Storage:
+    def commit(self, writes, progress=None):
+        raise NotImplementedError
+
+    def get_task(self, name):
+        raise NotImplementedError
+
+    def set_task(self, name, data):
+        self.commit([Write("set", "tasks", name, data)])
+
+    def update_task(self, name, fields):
+        self.commit([Write("update", "tasks", name, fields)])
+
+    def transact_task(self, name, build):
+        writes, result = build(self.get_task(name))
+        if writes:
+            self.commit(writes)
+        return result
+
+    def delete_task(self, name):
+        raise NotImplementedError
+
+    def delete_all_tasks(self, progress=None):
+        raise NotImplementedError
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        raise NotImplementedError
+
+    def list_tasks(self, fields=None):
+        return list(self.iter_tasks(fields))
+
+    def dirty_tasks(self, fields=None):
+        return [(name, project(data, fields)) for name, data in self.iter_tasks() if data.get("Dirty")]
+
+    def task_names(self):
+        return [name for name, _ in self.iter_tasks(fields=[])]
+
+    def get_tasks(self, names):
+        return {name: self.get_task(name) for name in names}
+
+    def get_sessions(self, task, since=None):
+        raise NotImplementedError
+
+    def get_sessions_many(self, tasks):
+        return {task: self.get_sessions(task) for task in tasks}
+
+    def get_rollups(self, bucket):
+        raise NotImplementedError
+
+    def get_rollups_many(self, keys):
+        keys = [tuple(key) for key in keys]
+        rollups = dict.fromkeys(keys)
+        for bucket in dict.fromkeys(bucket for _, bucket in keys):
+            rollups.update(((task, bucket), data) for task, data in self.get_rollups(bucket)
+                           if (task, bucket) in rollups)
+        return rollups
+
+    def get_playlist(self, name):
+        raise NotImplementedError
+
+    def set_playlist(self, name, data):
+        self.commit([Write("set", "playlists", name, data)])
+
+    def update_playlist(self, name, fields):
+        self.commit([Write("update", "playlists", name, fields)])
+
+    def delete_playlist(self, name):
+        raise NotImplementedError
+
+    def delete_all_playlists(self, progress=None):
+        raise NotImplementedError
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        raise NotImplementedError
+
+    def list_playlists(self, fields=None):
+        return list(self.iter_playlists(fields))
+
+    def playlist_names(self):
+        return [name for name, _ in self.iter_playlists(fields=[])]
+
+
+class FirestoreStorage(Storage):
+    def __init__(self, db=None, cred_path="cred.json", async_db=None):
+        self._db = db
+        self._async_db = async_db
+        self.cred_path = cred_path
+
+    @property
+    def db(self):
+        if self._db is None:
+            self._db = firestore_client(self.cred_path)
+        return self._db
+
+    @property
+    def async_db(self):
+        import async_fetch
+
+        if self._async_db is None:
+            self._async_db = async_fetch.async_client(self.cred_path)
+        return self._async_db
+
+    def _ref(self, collection, key):
+        if collection == "sessions":
+            task, session_id = key
+            return self.db.collection("tasks").document(task).collection("sessions").document(session_id)
+        if collection == "rollups":
+            task, bucket = key
+            return self.db.collection("rollups").document(f"{task}|{bucket}")
+        return self.db.collection(collection).document(key)
+
+    def _translate(self, data):
+        if data is None:
+            return None
+        from google.cloud import firestore
+
+        translated = {}
+        for key, value in data.items():
+            if value is DELETE_FIELD:
+                value = firestore.DELETE_FIELD
+            elif isinstance(value, Increment):
+                value = firestore.Increment(value.value)
+            elif isinstance(value, Maximum):
+                value = firestore.Maximum(value.value)
+            translated[key] = value
+        return translated
+
+    def commit(self, writes, progress=None):
+        ops = [(write.kind, self._ref(write.collection, write.key), self._translate(write.data))
+               for write in stamp(writes)]
+        return commit_batches(self.db, ops, progress)
+
+    def transact_task(self, name, build, attempts=5):
+        from google.cloud import firestore
+
+        task_ref = self.db.collection("tasks").document(name)
+
+        @firestore.transactional
+        def run(transaction):
+            writes, result = build(task_ref.get(transaction=transaction).to_dict())
+            for write in stamp(writes or []):
+                ref, data = self._ref(write.collection, write.key), self._translate(write.data)
+                if write.kind == "set":
+                    transaction.set(ref, data)
+                elif write.kind == "merge":
+                    transaction.set(ref, data, merge=True)
+                elif write.kind == "update":
+                    transaction.update(ref, data)
+                else:
+                    transaction.delete(ref)
+            return result
+
+        return run(self.db.transaction(max_attempts=attempts))
+
+    def _tombstone(self, collection, key=None):
+        ref = self.db.collection("deletions").document(f"{collection}|{'*' if key is None else key}")
+        return "set", ref, {"Collection": collection, "Key": key, "Updated": time.time()}
+
+    def changes(self, since=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        def modified(query):
+            if since is None:
+                return stream_pages(query)
+            return stream_pages(query.where(filter=FieldFilter("Updated", ">", since)), order_by="Updated")
+
+        if since is not None:
+            for snapshot in modified(self.db.collection("deletions")):
+                data = snapshot.to_dict()
+                yield Write("delete", data["Collection"], data.get("Key"), data)
+        for collection in ("tasks", "playlists"):
+            for snapshot in modified(self.db.collection(collection)):
+                yield Write("set", collection, snapshot.id, snapshot.to_dict())
+        for snapshot in modified(self.db.collection_group("sessions")):
+            yield Write("set", "sessions", (snapshot.reference.parent.parent.id, snapshot.id), snapshot.to_dict())
+        for snapshot in modified(self.db.collection("rollups")):
+            data = snapshot.to_dict()
+            yield Write("set", "rollups", (data["Task"], data["Bucket"]), data)
+
+    def _iter(self, collection, fields=None, page_size=PAGE_SIZE):
+        query = self.db.collection(collection)
+        if fields is not None:
+            query = query.select(fields)
+        for snapshot in stream_pages(query, page_size):
+            yield snapshot.id, snapshot.to_dict()
+
+    def _delete_refs(self, refs, progress=None, page_size=PAGE_SIZE):
+        deleted = 0
+        page = []
+        for ref in refs:
+            page.append(("delete", ref, None))
+            if len(page) == page_size * 4:
+                deleted += commit_batches(self.db, page)
+                page = []
+                if progress:
+                    progress(deleted, deleted)
+        deleted += commit_batches(self.db, page)
+        if progress:
+            progress(deleted, deleted)
+        return deleted
+
+    def _delete_collection(self, collection, progress=None):
+        return self._delete_refs(self.db.collection(collection).list_documents(page_size=PAGE_SIZE), progress)
+
+    def get_task(self, name):
+        return self.db.collection("tasks").document(name).get().to_dict()
+
+    def delete_task(self, name):
+        task_ref = self.db.collection("tasks").document(name)
+        if not task_ref.get().exists:
+            return False
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        ops = [("delete", ref, None) for ref in task_ref.collection("sessions").list_documents()]
+        rollups = self.db.collection("rollups").where(filter=FieldFilter("Task", "==", name)).select([]).stream()
+        ops += [("delete", rollup.reference, None) for rollup in rollups]
+        commit_batches(self.db, ops + [("delete", task_ref, None), self._tombstone("tasks", name)])
+        return True
+
+    def delete_all_tasks(self, progress=None):
+        commit_batches(self.db, [self._tombstone("tasks")])
+        sessions = stream_pages(self.db.collection_group("sessions").select([]))
+        deleted = self._delete_refs((session.reference for session in sessions), progress)
+        deleted += self._delete_collection("rollups", progress)
+        return deleted + self._delete_collection("tasks", progress)
+
+    def get_rollups(self, bucket):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        rollups = self.db.collection("rollups").where(filter=FieldFilter("Bucket", "==", bucket)).stream()
+        return [(rollup.get("Task"), rollup.to_dict()) for rollup in rollups]
+
+    def get_rollups_many(self, keys):
+        import async_fetch
+
+        keys = [tuple(key) for key in keys]
+        documents = async_fetch.get_documents(self.async_db, [f"rollups/{task}|{bucket}" for task, bucket in keys])
+        return {(task, bucket): documents[f"rollups/{task}|{bucket}"] for task, bucket in keys}
+
+    def get_tasks(self, names):
+        import async_fetch
+
+        documents = async_fetch.get_documents(self.async_db, [f"tasks/{name}" for name in names])
+        return {path.split("/", 1)[1]: data for path, data in documents.items()}
+
+    def get_sessions_many(self, tasks):
+        import async_fetch
+
+        collections = async_fetch.get_collections(self.async_db, [f"tasks/{task}/sessions" for task in tasks])
+        return {path.split("/")[1]: sorted(sessions) for path, sessions in collections.items()}
+
+    def get_sessions(self, task, since=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.db.collection("tasks").document(task).collection("sessions")
+        if since:
+            query = query.where(filter=FieldFilter("Date", ">=", since))
+        return sorted((session.id, session.to_dict()) for session in query.stream())
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("tasks", fields, page_size)
+
+    def dirty_tasks(self, fields=None):
+        from google.cloud.firestore_v1.base_query import FieldFilter
+
+        query = self.db.collection("tasks").where(filter=FieldFilter("Dirty", "==", True))
+        if fields is not None:
+            query = query.select(fields)
+        return [(snapshot.id, snapshot.to_dict()) for snapshot in stream_pages(query)]
+
+    def get_playlist(self, name):
+        return self.db.collection("playlists").document(name).get().to_dict()
+
+    def delete_playlist(self, name):
+        playlist_ref = self.db.collection("playlists").document(name)
+        if not playlist_ref.get().exists:
+            return False
+        commit_batches(self.db, [("delete", playlist_ref, None), self._tombstone("playlists", name)])
+        return True
+
+    def delete_all_playlists(self, progress=None):
+        commit_batches(self.db, [self._tombstone("playlists")])
+        return self._delete_collection("playlists", progress)
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("playlists", fields, page_size)
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    name TEXT PRIMARY KEY,
+    date TEXT,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS tasks_date ON tasks (date);
+CREATE INDEX IF NOT EXISTS tasks_dirty ON tasks (json_extract(data, '$.Dirty'));
+
+CREATE TABLE IF NOT EXISTS playlists (
+    name TEXT PRIMARY KEY,
+    data TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS playlist_tasks (
+    playlist TEXT NOT NULL,
+    task TEXT NOT NULL,
+    PRIMARY KEY (playlist, task)
+);
+CREATE INDEX IF NOT EXISTS playlist_tasks_task ON playlist_tasks (task);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    task TEXT NOT NULL,
+    id TEXT NOT NULL,
+    date TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (task, id)
+);
+CREATE INDEX IF NOT EXISTS sessions_task_date ON sessions (task, date);
+CREATE INDEX IF NOT EXISTS sessions_date ON sessions (date);
+
+CREATE TABLE IF NOT EXISTS rollups (
+    task TEXT NOT NULL,
+    bucket TEXT NOT NULL,
+    data TEXT NOT NULL,
+    PRIMARY KEY (task, bucket)
+);
+CREATE INDEX IF NOT EXISTS rollups_bucket ON rollups (bucket);
+
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SqliteStorage(Storage):
+    def __init__(self, path="tracker.db"):
+        self.path = path
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+
+    def _get(self, table, name):
+        if table == "sessions":
+            row = self.conn.execute("SELECT data FROM sessions WHERE task = ? AND id = ?", name).fetchone()
+        elif table == "rollups":
+            row = self.conn.execute("SELECT data FROM rollups WHERE task = ? AND bucket = ?", name).fetchone()
+        else:
+            row = self.conn.execute(f"SELECT data FROM {table} WHERE name = ?", (name,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _delete(self, table, name):
+        if table == "sessions":
+            return self.conn.execute("DELETE FROM sessions WHERE task = ? AND id = ?", name).rowcount > 0
+        if table == "rollups":
+            return self.conn.execute("DELETE FROM rollups WHERE task = ? AND bucket = ?", name).rowcount > 0
+        deleted = self.conn.execute(f"DELETE FROM {table} WHERE name = ?", (name,)).rowcount
+        if table == "tasks":
+            self.conn.execute("DELETE FROM sessions WHERE task = ?", (name,))
+            self.conn.execute("DELETE FROM rollups WHERE task = ?", (name,))
+        elif table == "playlists":
+            self.conn.execute("DELETE FROM playlist_tasks WHERE playlist = ?", (name,))
+        return deleted > 0
+
+    def _iter(self, table, fields=None, page_size=PAGE_SIZE):
+        cursor = ""
+        while True:
+            if fields == []:
+                rows = self.conn.execute(
+                    f"SELECT name, NULL FROM {table} WHERE name > ? ORDER BY name LIMIT ?", (cursor, page_size)
+                ).fetchall()
+            else:
+                rows = self.conn.execute(
+                    f"SELECT name, data FROM {table} WHERE name > ? ORDER BY name LIMIT ?", (cursor, page_size)
+                ).fetchall()
+            for name, data in rows:
+                yield name, {} if data is None else project(json.loads(data), fields)
+            if len(rows) < page_size:
+                return
+            cursor = rows[-1][0]
+
+    def _put(self, table, name, data):
+        if table == "tasks":
+            self.conn.execute(
+                "INSERT OR REPLACE INTO tasks (name, date, data) VALUES (?, ?, ?)",
+                (name, data.get("Date"), json.dumps(data)),
+            )
+        elif table == "playlists":
+            self.conn.execute("INSERT OR REPLACE INTO playlists (name, data) VALUES (?, ?)", (name, json.dumps(data)))
+            self.conn.execute("DELETE FROM playlist_tasks WHERE playlist = ?", (name,))
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO playlist_tasks (playlist, task) VALUES (?, ?)",
+                [(name, task) for task in data.get("tasks", [])],
+            )
+        elif table == "sessions":
+            task, session_id = name
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (task, id, date, data) VALUES (?, ?, ?, ?)",
+                (task, session_id, data.get("Date", ""), json.dumps(data)),
+            )
+        elif table == "rollups":
+            task, bucket = name
+            self.conn.execute(
+                "INSERT OR REPLACE INTO rollups (task, bucket, data) VALUES (?, ?, ?)",
+                (task, bucket, json.dumps(data)),
+            )
+        else:
+            raise ValueError(f"Unknown collection '{table}'.")
+
+    def _apply(self, write):
+        if write.kind == "delete":
+            self._delete(write.collection, write.key)
+            return
+        if write.kind == "set":
+            data = apply_fields({}, write.data)
+        else:
+            data = self._get(write.collection, write.key)
+            if data is None and write.kind == "update":
+                raise KeyError(f"Document '{write.collection}/{write.key}' does not exist.")
+            data = apply_fields(data, write.data)
+        self._put(write.collection, write.key, data)
+
+    def commit(self, writes, progress=None):
+        with self.conn:
+            for write in writes:
+                self._apply(write)
+        if progress:
+            progress(len(writes), len(writes))
+        return len(writes)
+
+    def get_task(self, name):
+        return self._get("tasks", name)
+
+    def transact_task(self, name, build):
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            writes, result = build(self._get("tasks", name))
+            for write in writes or []:
+                self._apply(write)
+        except BaseException:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        return result
+
+    def delete_task(self, name):
+        with self.conn:
+            return self._delete("tasks", name)
+
+    def delete_all_tasks(self, progress=None):
+        with self.conn:
+            self.conn.execute("DELETE FROM sessions")
+            self.conn.execute("DELETE FROM rollups")
+            return self.conn.execute("DELETE FROM tasks").rowcount
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("tasks", fields, page_size)
+
+    def dirty_tasks(self, fields=None):
+        rows = self.conn.execute(
+            "SELECT name, data FROM tasks WHERE json_extract(data, '$.Dirty') = 1 ORDER BY name"
+        ).fetchall()
+        return [(name, project(json.loads(data), fields)) for name, data in rows]
+
+    def get_tasks(self, names):
+        names = list(names)
+        tasks = dict.fromkeys(names)
+        for start in range(0, len(names), 500):
+            chunk = names[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT name, data FROM tasks WHERE name IN ({', '.join('?' * len(chunk))})", chunk
+            ).fetchall()
+            tasks.update((name, json.loads(data)) for name, data in rows)
+        return tasks
+
+    def get_sessions_many(self, tasks):
+        tasks = list(tasks)
+        sessions = {task: [] for task in tasks}
+        for start in range(0, len(tasks), 500):
+            chunk = tasks[start:start + 500]
+            rows = self.conn.execute(
+                f"SELECT task, id, data FROM sessions WHERE task IN ({', '.join('?' * len(chunk))}) ORDER BY task, id",
+                chunk,
+            ).fetchall()
+            for task, session_id, data in rows:
+                sessions[task].append((session_id, json.loads(data)))
+        return sessions
+
+    def get_sessions(self, task, since=None):
+        rows = self.conn.execute(
+            "SELECT id, data FROM sessions WHERE task = ? AND date >= ? ORDER BY id", (task, since or "")
+        ).fetchall()
+        return [(session_id, json.loads(data)) for session_id, data in rows]
+
+    def get_rollups(self, bucket):
+        rows = self.conn.execute("SELECT task, data FROM rollups WHERE bucket = ? ORDER BY task", (bucket,)).fetchall()
+        return [(task, json.loads(data)) for task, data in rows]
+
+    def get_rollups_many(self, keys):
+        keys = [tuple(key) for key in keys]
+        rollups = dict.fromkeys(keys)
+        for start in range(0, len(keys), 250):
+            chunk = keys[start:start + 250]
+            rows = self.conn.execute(
+                f"SELECT task, bucket, data FROM rollups WHERE (task, bucket) IN (VALUES {', '.join(['(?, ?)'] * len(chunk))})",
+                [value for key in chunk for value in key],
+            ).fetchall()
+            rollups.update(((task, bucket), json.loads(data)) for task, bucket, data in rows)
+        return rollups
+
+    def get_playlist(self, name):
+        return self._get("playlists", name)
+
+    def delete_playlist(self, name):
+        with self.conn:
+            return self._delete("playlists", name)
+
+    def delete_all_playlists(self, progress=None):
+        with self.conn:
+            self.conn.execute("DELETE FROM playlist_tasks")
+            return self.conn.execute("DELETE FROM playlists").rowcount
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        return self._iter("playlists", fields, page_size)
+
+    def get_meta(self, key):
+        row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, str(value)))
+
+
+def firestore_client(cred_path="cred.json"):
+    with timed("import firebase_admin"):
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+
+    with timed("firestore client"):
+        if not firebase_admin._apps:
+            firebase_admin.initialize_app(credentials.Certificate(cred_path))
+        return firestore.client()
+
+
+def get_storage(backend=None):
+    backend = backend or os.environ.get("TRACKER_STORAGE", "firestore")
+    if backend == "sqlite":
+        return SqliteStorage(os.environ.get("TRACKER_DB", "tracker.db"))
+    if backend == "firestore":
+        return FirestoreStorage(cred_path=os.environ.get("TRACKER_CRED", "cred.json"))
+    if backend == "live":
+        from live import LiveStorage
+
+        return LiveStorage(FirestoreStorage(cred_path=os.environ.get("TRACKER_CRED", "cred.json")))
+    if backend == "synced":
+        from sync import SyncedStorage
+
+        remote = FirestoreStorage(cred_path=os.environ.get("TRACKER_CRED", "cred.json"))
+        return SyncedStorage(remote, SqliteStorage(os.environ.get("TRACKER_SNAPSHOT", "tracker_snapshot.db")))
+    raise ValueError(f"Unknown storage backend '{backend}'.")
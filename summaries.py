@@ -0,0 +1,79 @@
+from datetime import date
+
+from cache import MISSING, TTLCache
+from rollups import bucket_keys
+
+PERIODS = ("day", "week", "month")
+
+
+def task_status(task_data, today_rollup):
+    if not task_data or not task_data.get("Highscore") or task_data.get("Avg_10") is None:
+        return "no data"
+    if today_rollup and today_rollup.get("Threshold_Hits"):
+        return "hit today"
+    threshold = task_data.get("Threshold")
+    if threshold and task_data["Avg_10"] >= threshold:
+        return "above"
+    return "below"
+
+
+def summarize(members, tasks, rollups):
+    rows = []
+    percents = []
+    done = dict.fromkeys(PERIODS, 0)
+    for task_name in members:
+        task_data = tasks.get(task_name) or {}
+        highscore = task_data.get("Highscore")
+        average = task_data.get("Avg_10")
+        percent = round(100 * average / highscore, 1) if highscore and average is not None else None
+        percents.append(min(percent or 0, 100))
+        for period in PERIODS:
+            if (rollups[period].get(task_name) or {}).get("Count"):
+                done[period] += 1
+        today = rollups["day"].get(task_name)
+        rows.append((task_name, highscore, average, percent, task_status(task_data, today),
+                     (today or {}).get("Count", 0)))
+    return {
+        "tasks": rows,
+        "score": round(sum(percents) / len(percents), 1) if percents else None,
+        "completion": {period: (done[period], len(members)) for period in PERIODS},
+    }
+
+
+class PlaylistSummaries:
+    def __init__(self, storage, maxsize=64, ttl=300):
+        self.storage = storage
+        self.cache = TTLCache(maxsize, ttl)
+
+    def get(self, playlist_name, today=None):
+        today = today or date.today()
+        entry = self.cache.get(("summary", playlist_name))
+        if entry is not MISSING and entry[0] == today:
+            return entry[2]
+
+        playlist_data = self.storage.get_playlist(playlist_name)
+        if playlist_data is None:
+            return None
+        members = list(dict.fromkeys(playlist_data.get("tasks", [])))
+        tasks = self.storage.get_tasks(members) if members else {}
+        wanted = set(members)
+        buckets = {period: bucket for period, bucket in bucket_keys(today).items() if period in PERIODS}
+        found = self.storage.get_rollups_many([(task_name, bucket) for bucket in buckets.values()
+                                               for task_name in members]) if members else {}
+        rollups = {period: {task_name: found.get((task_name, bucket)) for task_name in members}
+                   for period, bucket in buckets.items()}
+        summary = summarize(members, tasks, rollups)
+        self.cache.put(("summary", playlist_name), (today, wanted, summary))
+        return summary
+
+    def invalidate_task(self, task_name):
+        for key in list(self.cache.entries):
+            entry = self.cache.peek(key)
+            if entry is MISSING or task_name in entry[1]:
+                self.cache.invalidate(key)
+
+    def invalidate(self, *playlist_names):
+        self.cache.invalidate(*[("summary", name) for name in playlist_names])
+
+    def clear(self):
+        self.cache.invalidate_kind("summary")
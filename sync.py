@@ -0,0 +1,113 @@
+from storage import PAGE_SIZE, Storage, stamp
+from timing import timed
+
+CLOCK_SKEW = 300
+
+
+class SyncedStorage(Storage):
+    def __init__(self, remote, local):
+        self.remote = remote
+        self.local = local
+        self.synced = False
+
+    def sync(self):
+        watermark = float(self.local.get_meta("watermark") or 0)
+        newest = watermark
+        deletions, writes = [], []
+        with timed("delta sync"):
+            for write in self.remote.changes(watermark - CLOCK_SKEW if watermark else None):
+                newest = max(newest, write.data.get("Updated") or 0)
+                (deletions if write.kind == "delete" else writes).append(write)
+
+            for write in deletions:
+                if write.key is not None:
+                    self.local.commit([write])
+                elif write.collection == "tasks":
+                    self.local.delete_all_tasks()
+                elif write.collection == "playlists":
+                    self.local.delete_all_playlists()
+            self.local.commit(writes)
+        self.local.set_meta("watermark", newest)
+        self.synced = True
+        return len(deletions) + len(writes)
+
+    def _ready(self):
+        if not self.synced:
+            self.sync()
+        return self.local
+
+    def commit(self, writes, progress=None):
+        self._ready()
+        writes = stamp(writes)
+        result = self.remote.commit(writes, progress)
+        try:
+            self.local.commit(writes)
+        except KeyError:
+            self.synced = False
+        return result
+
+    def transact_task(self, name, build):
+        self._ready()
+        attempt = {}
+
+        def capture(data):
+            attempt["data"] = data
+            attempt["writes"], result = build(data)
+            attempt["writes"] = stamp(attempt["writes"] or [])
+            return attempt["writes"], result
+
+        result = self.remote.transact_task(name, capture)
+        try:
+            if attempt["data"] is not None:
+                self.local.set_task(name, attempt["data"])
+            self.local.commit(attempt["writes"])
+        except KeyError:
+            self.synced = False
+        return result
+
+    def get_task(self, name):
+        return self._ready().get_task(name)
+
+    def delete_task(self, name):
+        deleted = self.remote.delete_task(name)
+        self._ready().delete_task(name)
+        return deleted
+
+    def delete_all_tasks(self, progress=None):
+        deleted = self.remote.delete_all_tasks(progress)
+        self._ready().delete_all_tasks()
+        return deleted
+
+    def iter_tasks(self, fields=None, page_size=PAGE_SIZE):
+        return self._ready().iter_tasks(fields, page_size)
+
+    def get_tasks(self, names):
+        return self._ready().get_tasks(names)
+
+    def get_sessions(self, task, since=None):
+        return self._ready().get_sessions(task, since)
+
+    def get_sessions_many(self, tasks):
+        return self._ready().get_sessions_many(tasks)
+
+    def get_rollups(self, bucket):
+        return self._ready().get_rollups(bucket)
+
+    def get_rollups_many(self, keys):
+        return self._ready().get_rollups_many(keys)
+
+    def get_playlist(self, name):
+        return self._ready().get_playlist(name)
+
+    def delete_playlist(self, name):
+        deleted = self.remote.delete_playlist(name)
+        self._ready().delete_playlist(name)
+        return deleted
+
+    def delete_all_playlists(self, progress=None):
+        deleted = self.remote.delete_all_playlists(progress)
+        self._ready().delete_all_playlists()
+        return deleted
+
+    def iter_playlists(self, fields=None, page_size=PAGE_SIZE):
+        return self._ready().iter_playlists(fields, page_size)
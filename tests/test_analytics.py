@@ -0,0 +1,38 @@
+from datetime import date
+
+import numpy as np
+
+from analytics import ScoreTable, period_start
+
+
+def test_period_start():
+    today = date(2024, 5, 15)
+    assert period_start(today, "week") == date(2024, 5, 13)
+    assert period_start(today, "month") == date(2024, 5, 1)
+    assert period_start(today, "year") == date(2024, 1, 1)
+    assert period_start(today, "all") is None
+
+
+def test_period_stats():
+    table = ScoreTable.from_records([
+        ("a", "2024-05-15", 10),
+        ("a", "2024-05-14", 20),
+        ("a", "2024-04-30", 40),
+        ("b", "2023-12-31", 5),
+        ("b", "2024-05-15", 7),
+    ])
+    stats = table.period_stats(today=date(2024, 5, 15))
+
+    assert list(stats.index) == ["a", "b"]
+    assert stats.loc["a", "count_day"] == 1 and stats.loc["a", "avg_day"] == 10
+    assert stats.loc["a", "count_week"] == 2 and stats.loc["a", "avg_week"] == 15 and stats.loc["a", "max_week"] == 20
+    assert stats.loc["a", "count_year"] == 3 and stats.loc["a", "max_year"] == 40
+    assert stats.loc["a", "avg_all"] == round(70 / 3, 2)
+    assert stats.loc["b", "count_year"] == 1 and stats.loc["b", "count_all"] == 2 and stats.loc["b", "max_all"] == 7
+
+
+def test_period_stats_without_scores_in_period():
+    stats = ScoreTable.from_records([("a", "2024-01-01", 10)]).period_stats(today=date(2024, 5, 15), periods=["month"])
+    assert stats.loc["a", "count_month"] == 0
+    assert np.isnan(stats.loc["a", "avg_month"]) and np.isnan(stats.loc["a", "max_month"])
+    assert len(ScoreTable.from_records([]).period_stats()) == 0
@@ -0,0 +1,91 @@
+import pytest
+
+from cache import CachedStorage
+from storage import Increment, SqliteStorage, Write
+
+
+def test_iter_tasks_streams_from_the_backend(tmp_path):
+    backend = SqliteStorage(str(tmp_path / "tracker.db"))
+    for name in ("a", "b", "c"):
+        backend.set_task(name, {"Tasks": name, "Highscore": 1})
+    cached = CachedStorage(backend)
+
+    tasks = cached.iter_tasks(fields=["Highscore"], page_size=2)
+    assert not isinstance(tasks, list)
+    assert list(tasks) == [(name, {"Highscore": 1}) for name in ("a", "b", "c")]
+    assert dict(cached.iter_playlists()) == {}
+    assert cached.task_names() == ["a", "b", "c"]
+    assert sorted(key[0] for key in cached.cache.entries) == ["task_names"]
+
+
+class CountingStorage(SqliteStorage):
+    def __init__(self, path):
+        super().__init__(path)
+        self.reads = []
+        self.fail = False
+
+    def get_task(self, name):
+        self.reads.append(("get_task", name))
+        return super().get_task(name)
+
+    def get_rollups(self, bucket):
+        self.reads.append(("get_rollups", bucket))
+        return super().get_rollups(bucket)
+
+    def commit(self, writes, progress=None):
+        if self.fail:
+            raise ConnectionError("offline")
+        return super().commit(writes, progress)
+
+
+@pytest.fixture
+def cached(tmp_path):
+    backend = CountingStorage(str(tmp_path / "tracker.db"))
+    backend.set_task("a", {"Highscore": 1, "Version": 1})
+    return CachedStorage(backend), backend
+
+
+def test_commit_updates_cached_documents(cached):
+    cached, backend = cached
+    assert cached.get_task("a") == {"Highscore": 1, "Version": 1}
+    cached.commit([Write("update", "tasks", "a", {"Highscore": 5})])
+    assert cached.get_task("a") == {"Highscore": 5, "Version": 1}
+    assert backend.reads == [("get_task", "a")]
+
+    cached.get_rollups("2024-01-01")
+    cached.commit([Write("merge", "rollups", ("a", "2024-01-01"), {"Task": "a", "Count": Increment(1)})])
+    assert cached.get_rollups("2024-01-01") == [("a", {"Task": "a", "Count": 1})]
+    assert backend.reads.count(("get_rollups", "2024-01-01")) == 2
+
+
+def test_failed_commit_drops_cached_documents(cached):
+    cached, backend = cached
+    cached.get_task("a")
+    backend.fail = True
+    with pytest.raises(ConnectionError):
+        cached.commit([Write("update", "tasks", "a", {"Highscore": 5})])
+    assert cached.get_task("a") == {"Highscore": 1, "Version": 1}
+    assert backend.reads == [("get_task", "a")] * 2
+
+
+def test_transact_task_caches_the_written_result(cached):
+    cached, backend = cached
+    cached.get_task("a")
+
+    def build(data):
+        return [Write("update", "tasks", "a", {"Version": data["Version"] + 1})], True
+
+    assert cached.transact_task("a", build)
+    assert cached.get_task("a") == {"Highscore": 1, "Version": 2}
+    assert backend.get_task("a") == {"Highscore": 1, "Version": 2}
+    assert backend.reads.count(("get_task", "a")) == 2
+
+
+def test_delete_task_clears_task_and_listings(cached):
+    cached, backend = cached
+    assert cached.task_names() == ["a"]
+    cached.get_task("a")
+    cached.delete_task("a")
+    assert cached.get_task("a") is None
+    assert cached.task_names() == []
+    assert backend.reads == [("get_task", "a")]
@@ -0,0 +1,80 @@
+import contextlib
+import io
+import os
+
+import pytest
+
+import importer
+from storage import SqliteStorage
+from tracker import Tracker
+
+
+def write_run(directory, scenario, stamp, score, mtime, sensitivity=None):
+    path = os.path.join(directory, f"{scenario} - Challenge - {stamp} Stats.csv")
+    with open(path, "w") as file:
+        file.write(f"Scenario:,{scenario}\n" + (f"Score:,{score}\n" if score is not None else "")
+                   + (f"Horiz Sens:,{sensitivity}\n" if sensitivity is not None else ""))
+    os.utime(path, (mtime, mtime))
+    return os.path.basename(path)
+
+
+@pytest.fixture
+def setup(tmp_path):
+    stats = tmp_path / "stats"
+    stats.mkdir()
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.create_task("a", 100)
+    names = [write_run(str(stats), "a", "2024.01.01-10.00.00", 90, 100),
+             write_run(str(stats), "b", "2024.01.01-11.00.00", 80, 200),
+             write_run(str(stats), "a", "2024.01.01-12.00.00", None, 300)]
+    return tracker, str(stats), str(tmp_path / "state.json"), names
+
+
+def test_unmatched_and_unparsed_runs_are_retried(setup):
+    tracker, stats, state_path, (a, b, empty) = setup
+    summary = importer.import_stats(tracker, stats, state_path, workers=1)
+    state = importer.load_state(state_path)
+    assert summary["unmatched"] == ["b"]
+    assert a not in state["files"] and b not in state["files"]
+    assert state["high_water"] == 200
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.create_task("b", 100)
+    summary = importer.import_stats(tracker, stats, state_path, workers=1)
+    state = importer.load_state(state_path)
+    assert summary["runs"] == 1
+    assert state["high_water"] == 300
+    assert state["files"] == {}
+    assert tracker.storage.get_task("b")["Repetitions"] == 1
+
+
+def test_full_scan_rereads_known_files(setup):
+    tracker, stats, state_path, (a, b, empty) = setup
+    importer.import_stats(tracker, stats, state_path, workers=1)
+    found = [os.path.basename(path) for path, _ in
+             importer.scan_stats_dir(stats, importer.load_state(state_path), full=True)]
+    assert sorted(found) == sorted([a, b, empty])
+
+    summary = importer.import_stats(tracker, stats, state_path, workers=1, full=True)
+    assert summary["runs"] == 0 and summary["duplicates"] == 1
+    assert tracker.storage.get_task("a")["Repetitions"] == 1
+
+
+def test_older_runs_do_not_move_the_task_back(tmp_path):
+    stats = tmp_path / "stats"
+    stats.mkdir()
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.create_task("a", 100)
+        tracker.record_session("a", [90], 0.5, "2024-03-01")
+    write_run(str(stats), "a", "2024.01.01-10.00.00", 70, 100, 0.3)
+    write_run(str(stats), "a", "2024.01.02-10.00.00", 75, 200, 0.3)
+
+    summary = importer.import_stats(tracker, str(stats), str(tmp_path / "state.json"), workers=1)
+    task = tracker.storage.get_task("a")
+    assert summary["runs"] == 2
+    assert task["Date"] == "2024-03-01"
+    assert task["Sensitivity"] == 0.5
+    assert task["Avg_Daily"] == 90
+    assert task["Repetitions"] == 3
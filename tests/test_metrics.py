@@ -0,0 +1,23 @@
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+
+import async_fetch
+from benchmarks.fake_firestore import FakeAsyncFirestore, FakeFirestore
+from metrics import MeteredClient, Metrics, operation
+
+
+def test_async_reads_are_metered():
+    client = FakeFirestore()
+    for name in ("a", "b"):
+        client.collection("tasks").document(name).set({"highscore": 1})
+    metrics = Metrics()
+    metered = MeteredClient(FakeAsyncFirestore(client), metrics)
+
+    with operation("view_tasks"):
+        documents = async_fetch.get_documents(metered, ["tasks/a", "tasks/b", "tasks/missing"])
+    assert documents["tasks/a"] == {"highscore": 1} and documents["tasks/missing"] is None
+    assert metrics.documents["view_tasks"]["reads"] == 3
+    assert metrics.documents["view_tasks"]["read_bytes"] > 0
+    assert "FakeAsyncFirestore.get_all" in metrics.latency
+
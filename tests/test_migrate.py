@@ -0,0 +1,72 @@
+import contextlib
+import io
+
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+
+import migrate
+from benchmarks.fake_firestore import FakeFirestore
+from storage import TASK_FIELDS, SqliteStorage
+from tracker import Tracker
+
+
+@pytest.fixture
+def legacy():
+    db = FakeFirestore()
+    db.collection("playlists").document("p1").set({"name": "bench", "tasks": ["a", "b"]})
+    db.collection("tasks").document("bench_a").set({"highscore": 100,
+                                                     "scores": [{"date": "2024-01-01", "score": 90}]})
+    db.collection("tasks").document("bench_b").set({"highscore": 50, "threshold": 48, "update": "2024-01-02"})
+    return db
+
+
+def test_migrated_tasks_have_the_full_schema(tmp_path, legacy):
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        state = migrate.migrate(tracker, legacy, str(tmp_path / "state.json"))
+        tracker.current_task = "a"
+        tracker.view_task_data()
+
+    assert state["finished"]
+    assert "Threshold_Achieved" in output.getvalue()
+    a, b = tracker.storage.get_task("a"), tracker.storage.get_task("b")
+    assert all(field in a and field in b for field in TASK_FIELDS)
+    assert a["Repetitions"] == 1 and a["Threshold"] == 90
+    assert b["Date"] == "2024-01-02" and b["Threshold"] == 48
+
+
+def test_rerun_keeps_existing_fields(tmp_path, legacy):
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    tracker.storage.set_task("a", {"Tasks": "a", "Date": "2024-02-01", "Old_Highscore": 80, "Highscore": 95})
+    with contextlib.redirect_stdout(io.StringIO()):
+        migrate.migrate(tracker, legacy, str(tmp_path / "state.json"))
+    a = tracker.storage.get_task("a")
+    assert a["Date"] == "2024-02-01" and a["Old_Highscore"] == 80 and a["Highscore"] == 100
+    assert all(field in a for field in TASK_FIELDS)
+
+
+def test_delete_source_commits_page_by_page(legacy, monkeypatch):
+    for i in range(3):
+        legacy.collection("tasks").document(f"bench_extra{i}").set({"highscore": 1})
+    legacy.collection("playlists").document("p1").update({"tasks": ["a", "b", "extra0", "extra1", "extra2"]})
+    legacy.collection("tasks").document("bench_a").collection("sessions").document("s").set({"date": "2024-01-01"})
+    commits = []
+    commit_batches = migrate.commit_batches
+    monkeypatch.setattr(migrate, "commit_batches", lambda db, ops: commits.append(len(ops)) or commit_batches(db, ops))
+    assert migrate.delete_source(legacy, page_size=2) == 5
+    assert commits == [3, 2, 2]
+    assert list(legacy.collection("tasks").stream()) == []
+    assert list(legacy.collection("playlists").stream()) == []
+
+
+def test_migrate_legacy_uses_configured_credentials(tmp_path, monkeypatch):
+    import storage
+
+    paths = []
+    monkeypatch.setenv("TRACKER_CRED", "other.json")
+    monkeypatch.setattr(storage, "firestore_client", lambda path="cred.json": paths.append(path))
+    monkeypatch.setattr(migrate, "migrate", lambda *args, **kwargs: {"documents": 0, "playlists": 0, "skipped": 0})
+    with contextlib.redirect_stdout(io.StringIO()):
+        Tracker(SqliteStorage(str(tmp_path / "tracker.db"))).migrate_legacy()
+    assert paths == ["other.json"]
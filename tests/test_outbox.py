@@ -0,0 +1,129 @@
+import contextlib
+import io
+
+import pytest
+
+from outbox import QueuedStorage, coalesce, combine_fields
+from storage import DELETE_FIELD, Increment, Maximum, SqliteStorage, Write
+
+
+class RecordingStorage:
+    def __init__(self):
+        self.calls = []
+        self.fail = None
+
+    def commit(self, writes, progress=None):
+        if self.fail:
+            raise self.fail
+        self.calls.append(("commit", [(write.kind, write.key, write.data) for write in writes]))
+        return len(writes)
+
+    def delete_task(self, name):
+        self.calls.append(("delete_task", name))
+        return True
+
+
+@pytest.fixture
+def queue(tmp_path):
+    storage = RecordingStorage()
+    outbox = QueuedStorage(storage, str(tmp_path / "outbox.db"), start=False)
+    yield outbox, storage
+    outbox.conn.close()
+
+
+def test_combine_fields_adds_increments_and_keeps_maximum():
+    combined = combine_fields({"Count": Increment(2), "Max": Maximum(5), "Name": "a"},
+                              {"Count": Increment(3), "Max": Maximum(4), "Name": "b"})
+    assert combined == {"Count": Increment(5), "Max": Maximum(5), "Name": "b"}
+
+
+def test_combine_fields_applies_transforms_to_plain_values():
+    combined = combine_fields({"Count": 4, "Max": 7, "Gone": DELETE_FIELD},
+                              {"Count": Increment(1), "Max": Maximum(9), "Gone": Increment(2)})
+    assert combined == {"Count": 5, "Max": 9, "Gone": 2}
+
+
+def test_combine_fields_refuses_mixed_transforms():
+    assert combine_fields({"Count": Increment(1)}, {"Count": Maximum(3)}) is None
+
+
+def test_coalesce_later_set_or_delete_wins():
+    first = Write("update", "tasks", "a", {"Highscore": 1})
+    assert coalesce(first, Write("set", "tasks", "a", {"Highscore": 2})).kind == "set"
+    assert coalesce(first, Write("delete", "tasks", "a")).kind == "delete"
+
+
+def test_coalesce_folds_updates_into_set():
+    combined = coalesce(Write("set", "tasks", "a", {"Count": 1, "Name": "a"}),
+                        Write("update", "tasks", "a", {"Count": Increment(2), "Name": DELETE_FIELD}))
+    assert combined == Write("set", "tasks", "a", {"Count": 3})
+
+
+def test_coalesce_after_delete():
+    deleted = Write("delete", "tasks", "a")
+    assert coalesce(deleted, Write("merge", "tasks", "a", {"Count": Increment(2)})) == \
+        Write("set", "tasks", "a", {"Count": 2})
+    assert coalesce(deleted, Write("update", "tasks", "a", {"Count": 1})) is None
+
+
+def test_coalesce_update_and_merge_becomes_merge():
+    combined = coalesce(Write("update", "rollups", ("a", "2024"), {"Count": Increment(1)}),
+                        Write("merge", "rollups", ("a", "2024"), {"Count": Increment(2)}))
+    assert combined.kind == "merge"
+    assert combined.data == {"Count": Increment(3)}
+
+
+def test_queued_writes_coalesce_per_document(queue):
+    outbox, storage = queue
+    for _ in range(5):
+        outbox.commit([Write("merge", "rollups", ("a", "2024"), {"Count": Increment(1)})])
+    assert outbox.pending() == 1
+    assert outbox.replay() == 1
+    assert storage.calls == [("commit", [("merge", ("a", "2024"), {"Count": Increment(5)})])]
+
+
+def test_replay_keeps_order_around_calls(queue):
+    outbox, storage = queue
+    outbox.commit([Write("set", "tasks", "a", {"Highscore": 1}), Write("set", "tasks", "b", {"Highscore": 1})])
+    outbox.delete_task("a")
+    outbox.commit([Write("set", "tasks", "a", {"Highscore": 2})])
+    outbox.commit([Write("update", "tasks", "b", {"Highscore": 3})])
+
+    assert outbox.flush() == 0
+    assert storage.calls == [
+        ("commit", [("set", "a", {"Highscore": 1}), ("set", "b", {"Highscore": 1})]),
+        ("delete_task", "a"),
+        ("commit", [("set", "a", {"Highscore": 2}), ("update", "b", {"Highscore": 3})]),
+    ]
+
+
+def test_transient_error_keeps_entries(queue):
+    outbox, storage = queue
+    outbox.commit([Write("set", "tasks", "a", {"Highscore": 1})])
+    storage.fail = ConnectionError("offline")
+    with pytest.raises(ConnectionError):
+        outbox.replay()
+    assert outbox.pending() == 1
+
+    storage.fail = None
+    assert outbox.replay() == 1
+    assert outbox.pending() == 0
+
+
+def test_permanent_error_parks_only_the_bad_entry(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "tracker.db"))
+    storage.set_task("kept", {"Highscore": 1})
+    outbox = QueuedStorage(storage, str(tmp_path / "outbox.db"), start=False)
+    outbox.commit([
+        Write("update", "tasks", "kept", {"Highscore": 2}),
+        Write("update", "tasks", "deleted elsewhere", {"Highscore": 3}),
+        Write("set", "tasks", "new", {"Highscore": 4}),
+    ])
+
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        assert outbox.flush() == 0
+    assert "deleted elsewhere" in output.getvalue()
+    assert storage.get_task("kept") == {"Highscore": 2}
+    assert storage.get_task("new") == {"Highscore": 4}
+    assert outbox.conn.execute("SELECT key FROM outbox_failed").fetchall() == [('"deleted elsewhere"',)]
+    outbox.conn.close()
@@ -0,0 +1,52 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from rolling import RollingStats, ewma_update
+
+
+def scores(seed, count):
+    rng = random.Random(seed)
+    return [round(rng.uniform(50, 150), 2) for _ in range(count)]
+
+
+def test_ewma_matches_pandas():
+    values = scores(0, 37)
+    current = None
+    for start in range(0, len(values), 5):
+        current = ewma_update(current, values[start:start + 5], 2 / 11)
+    assert np.isclose(current, pd.Series(values).ewm(span=10, adjust=False).mean().iloc[-1])
+
+
+def test_incremental_table_matches_full_recompute():
+    history = {"a": scores(1, 45), "b": scores(2, 7)}
+    incremental = RollingStats()
+    for task, values in history.items():
+        for start in range(0, len(values), 4):
+            incremental.extend(task, values[start:start + 4])
+            incremental.table()
+
+    sessions = {task: [(f"{index:03d}", {"Scores": values[index:index + 4]}) for index in range(0, len(values), 4)]
+                for task, values in history.items()}
+    full = RollingStats.from_sessions(sessions)
+    pd.testing.assert_frame_equal(incremental.table(), full.table())
+
+    tail = np.array(history["a"][-20:])
+    row = full.table().loc["a"]
+    assert row["reps"] == 45
+    assert row["median"] == round(float(np.median(tail)), 2)
+    assert row["std"] == round(float(tail.std()), 2)
+
+
+def test_table_recomputes_only_changed_tasks():
+    stats = RollingStats()
+    stats.extend("a", [100, 110])
+    stats.extend("b", [90])
+    stats.table()
+    stats.extend("a", [120])
+    assert stats.dirty == {"a"}
+    table = stats.table(["b", "a", "missing"])
+    assert list(table.index) == ["b", "a"]
+    assert table.loc["a", "reps"] == 3 and table.loc["b", "reps"] == 1
+    assert not stats.dirty
@@ -0,0 +1,38 @@
+import contextlib
+import io
+
+from rollups import bucket_keys, build_rollups, rollup_writes
+from storage import SqliteStorage, apply_fields
+from tracker import Tracker
+
+
+def test_bucket_keys():
+    assert bucket_keys("2024-12-30") == {"day": "2024-12-30", "week": "2025-W01", "month": "2024-12", "year": "2024"}
+
+
+def test_rollup_writes_and_build_rollups_agree():
+    sessions = [("1", {"Date": "2024-01-01", "Scores": [80, 95], "Threshold": 90}),
+                ("2", {"Date": "2024-01-02", "Scores": [70, 120], "Threshold": 90}),
+                ("3", {"Date": "2024-01-02", "Scores": [100, 105], "Threshold": 108})]
+    merged = {}
+    for _, session in sessions:
+        for write in rollup_writes("a", session["Date"], session["Scores"], session["Threshold"]):
+            merged[write.key] = apply_fields(merged.get(write.key), write.data)
+    built = {write.key: write.data for write in build_rollups("a", sessions, 50)}
+    assert built == merged
+    assert built[("a", "2024-01")]["Threshold_Hits"] == 2
+
+
+def test_backfill_keeps_threshold_hits(tmp_path):
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    storage = tracker.storage.storage
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.create_task("a", 100)
+        tracker.record_session("a", [92, 110], 0.4, "2024-01-01")
+        tracker.record_session("a", [100, 101], 0.4, "2024-01-02")
+        tracker.edit_task("a", 200)
+        before = storage.get_rollups("2024-01")
+        tracker.backfill_rollups()
+    after = storage.get_rollups("2024-01")
+    assert [data["Threshold_Hits"] for _, data in before] == [4]
+    assert [(task, {key: data[key] for key in before[0][1]}) for task, data in after] == before
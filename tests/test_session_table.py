@@ -0,0 +1,65 @@
+import contextlib
+import io
+
+from session_table import SessionTable
+from storage import SqliteStorage, Write
+from tracker import Tracker
+
+
+def test_backdated_day_uses_its_own_scores():
+    table = SessionTable()
+    table.record("a", "2024-01-02", [100, 100])
+    table.record("a", "2024-01-03", [90])
+    table.record("a", "2024-01-01", [50])
+
+    backdated = table.get("a", "2024-01-01")
+    assert backdated["Repetitions"] == 1
+    assert backdated["Avg_Daily"] == 50.0
+    assert table.get("a", "2024-01-02")["Repetitions"] == 2
+
+    table.record("a", "2024-01-02", [70])
+    assert table.get("a", "2024-01-02")["Repetitions"] == 3
+    assert table.get("a", "2024-01-02")["Avg_Daily"] == 90.0
+
+
+def test_history_loads_only_the_viewed_task(tmp_path):
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        for task_name in ("a", "b"):
+            tracker.create_task(task_name, 100)
+            tracker.record_session(task_name, [80, 90], 0.4, "2024-01-01")
+        tracker.view_task_history("a")
+        tracker.record_session("a", [95], 0.4, "2024-01-01")
+        tracker.record_session("b", [95], 0.4, "2024-01-01")
+
+    table = tracker.session_table
+    assert "2024-01-01" in output.getvalue()
+    assert table.has_task("a") and not table.has_task("b")
+    assert table.get("a", "2024-01-01")["Repetitions"] == 3
+    assert table.get("b", "2024-01-01") is None
+
+    tracker.session_table.load(tracker.storage, ["b"])
+    assert table.get("b", "2024-01-01")["Repetitions"] == 3
+
+
+def test_history_uses_stored_thresholds(tmp_path):
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.create_task("a", 100)
+        tracker.record_session("a", [70], 0.4, "2024-01-01")
+        tracker.record_session("a", [110], 0.4, "2024-01-02")
+        tracker.view_task_history("a")
+        tracker.record_session("a", [80], 0.4, "2024-01-03")
+    assert [day["Threshold"] for day in tracker.session_table.days("a")] == [90, 90, 99]
+
+    storage = tracker.storage.storage
+    assert [day["Threshold"] for day in SessionTable().load(storage, ["a"]).days("a")] == [90, 90, 99]
+
+
+def test_history_seeds_highscore_from_task(tmp_path):
+    storage = SqliteStorage(str(tmp_path / "tracker.db"))
+    storage.set_task("a", {"Tasks": "a", "Highscore": 100})
+    storage.commit([Write("set", "sessions", ("a", "1"), {"Date": "2024-01-01", "Scores": [70]}),
+                    Write("set", "sessions", ("a", "2"), {"Date": "2024-01-02", "Scores": [80]})])
+    days = SessionTable().load(storage, ["a"]).days("a")
+    assert [(day["Old_Highscore"], day["Highscore"], day["Threshold"]) for day in days] == [(100, 100, 90)] * 2
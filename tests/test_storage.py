@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+
+from google.api_core.exceptions import DeadlineExceeded
+from google.cloud import firestore
+
+from benchmarks.fake_firestore import FakeBatch, FakeFirestore
+from storage import commit_batches
+
+
+class LandsThenTimesOut(FakeBatch):
+    failures = 1
+
+    def commit(self):
+        super().commit()
+        if LandsThenTimesOut.failures:
+            LandsThenTimesOut.failures -= 1
+            raise DeadlineExceeded("timed out")
+
+
+class FlakyFirestore(FakeFirestore):
+    def batch(self):
+        return LandsThenTimesOut(self)
+
+
+def test_increments_are_not_retried_blindly():
+    LandsThenTimesOut.failures = 1
+    db = FlakyFirestore()
+    ref = db.collection("rollups").document("a|2024")
+    with pytest.raises(DeadlineExceeded):
+        commit_batches(db, [("merge", ref, {"Count": firestore.Increment(1)})], retries=3)
+    assert ref.get().to_dict() == {"Count": 1}
+
+
+def test_plain_writes_are_retried():
+    LandsThenTimesOut.failures = 1
+    db = FlakyFirestore()
+    ref = db.collection("tasks").document("a")
+    assert commit_batches(db, [("set", ref, {"Highscore": 1})], retries=1) == 1
+    assert ref.get().to_dict() == {"Highscore": 1}
+
+
+def test_chunks_touching_the_same_document_keep_their_order():
+    db = FakeFirestore()
+    refs = [db.collection("tasks").document(str(i)) for i in range(600)]
+    ops = [("set", ref, {"Value": 1}) for ref in refs]
+    ops += [("update", refs[0], {"Value": 2})] + [("merge", ref, {"Count": firestore.Increment(1)}) for ref in refs]
+    assert commit_batches(db, ops, workers=8) == len(ops)
+    assert refs[0].get().to_dict() == {"Value": 2, "Count": 1}
+    assert all(ref.get().to_dict()["Count"] == 1 for ref in refs)
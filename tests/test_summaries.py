@@ -0,0 +1,54 @@
+import contextlib
+import io
+from datetime import date
+
+from storage import SqliteStorage
+from summaries import PlaylistSummaries
+from tracker import Tracker
+
+
+class CountingStorage(SqliteStorage):
+    def __init__(self, path):
+        super().__init__(path)
+        self.calls = []
+
+    def get_rollups(self, bucket):
+        self.calls.append(("get_rollups", bucket))
+        return super().get_rollups(bucket)
+
+    def get_rollups_many(self, keys):
+        keys = list(keys)
+        self.calls.append(("get_rollups_many", sorted({task for task, _ in keys})))
+        return super().get_rollups_many(keys)
+
+
+def test_summary_reads_only_member_rollups(tmp_path):
+    storage = CountingStorage(str(tmp_path / "tracker.db"))
+    tracker = Tracker(storage)
+    today = date.today().isoformat()
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        for task_name in ("a", "b", "other"):
+            tracker.create_task(task_name, 100)
+            tracker.record_session(task_name, [80, 91, 92], 0.4, today)
+        tracker.storage.set_playlist("p", {"playlist_name": "p", "tasks": ["a", "b", "missing"]})
+        tracker.view_playlist_summary("p")
+
+    assert storage.calls == [("get_rollups_many", ["a", "b", "missing"])]
+    assert "87.67" in output.getvalue() and "87.666" not in output.getvalue()
+
+    summary = PlaylistSummaries(storage).get("p")
+    assert summary["completion"]["day"] == (2, 3)
+    assert [row[5] for row in summary["tasks"]] == [3, 3, 0]
+
+
+def test_get_rollups_many_matches_get_rollups(tmp_path):
+    tracker = Tracker(SqliteStorage(str(tmp_path / "tracker.db")))
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.create_task("a", 100)
+        tracker.record_session("a", [80], 0.4, "2024-01-01")
+    storage = tracker.storage.storage
+    keys = [("a", "2024-01-01"), ("a", "2024-01-02"), ("b", "2024-01-01")]
+    expected = dict.fromkeys(keys)
+    expected.update((("a", "2024-01-01"), data) for task, data in storage.get_rollups("2024-01-01"))
+    assert storage.get_rollups_many(keys) == expected
+    assert tracker.storage.get_rollups_many(keys) == expected
@@ -0,0 +1,120 @@
+import contextlib
+import io
+
+import pytest
+
+pytest.importorskip("google.cloud.firestore")
+
+from benchmarks.fake_firestore import FakeAsyncFirestore, FakeFirestore
+from outbox import QueuedStorage
+from storage import FirestoreStorage
+from tracker import Tracker
+
+
+def make_tracker(client):
+    return Tracker(FirestoreStorage(db=client, async_db=FakeAsyncFirestore(client)))
+
+
+@pytest.fixture
+def quiet():
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def test_record_sessions_does_not_overwrite_newer_task_data(quiet):
+    client = FakeFirestore()
+    watcher, menu = make_tracker(client), make_tracker(client)
+    menu.create_task("a", 100)
+    menu.record_session("a", [80, 81], 0.4, "2024-01-01")
+    watcher.storage.get_tasks(["a"])
+
+    menu.record_session("a", [82], 0.4, "2024-01-02")
+    version = menu.storage.storage.get_task("a")["Version"]
+    watcher.record_sessions([("a", [83, 84], 0.4, "2024-01-02", None)])
+
+    task = make_tracker(client).storage.get_task("a")
+    reps = sum(len(data["Scores"]) for _, data in make_tracker(client).storage.get_sessions("a"))
+    assert reps == 5
+    assert task["Repetitions"] == 5
+    assert task["Stats"]["Count"] == 5
+    assert task["Version"] == version + 1
+
+
+def test_record_sessions_skips_missing_tasks(quiet):
+    client = FakeFirestore()
+    tracker = make_tracker(client)
+    tracker.create_task("a", 100)
+    written, skipped = tracker.record_sessions([("a", [90], 0.4, "2024-01-01", None),
+                                                ("missing", [90], 0.4, "2024-01-01", None)])
+    assert skipped == ["missing"]
+    assert written == 6
+    assert tracker.storage.get_task("a")["Repetitions"] == 1
+
+
+class Offline:
+    def __init__(self, storage):
+        self.storage = storage
+        self.online = True
+
+    def __getattr__(self, name):
+        if not self.online:
+            raise ConnectionError("offline")
+        return getattr(self.storage, name)
+
+
+def test_record_session_queues_while_offline(tmp_path, quiet):
+    client = FakeFirestore()
+    remote = Offline(FirestoreStorage(db=client, async_db=FakeAsyncFirestore(client)))
+    outbox = QueuedStorage(remote, str(tmp_path / "outbox.db"), start=False)
+    tracker = Tracker(outbox)
+    tracker.create_task("a", 100)
+    tracker.record_session("a", [85], 0.4, "2024-01-01")
+    outbox.flush()
+    tracker.storage.get_task("a")
+
+    remote.online = False
+    assert tracker.record_session("a", [90, 95], 0.4, "2024-01-01") is not None
+    assert tracker.record_session("a", [97], 0.4, "2024-01-01") is not None
+    assert outbox.pending() > 0
+
+    remote.online = True
+    assert outbox.flush() == 0
+    task = make_tracker(client).storage.get_task("a")
+    assert task["Repetitions"] == 4
+    assert task["Highscore"] == 100
+    outbox.conn.close()
+
+
+def test_refresh_keeps_edited_threshold(quiet):
+    client = FakeFirestore()
+    tracker = make_tracker(client)
+    tracker.create_task("a", 100)
+    tracker.record_session("a", [80, 120], 0.4, "2024-01-01")
+    tracker.record_session("a", [90], 0.4, "2024-01-02")
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        tracker.refresh()
+    assert "0 updated" in output.getvalue()
+
+    tracker.edit_task("a", 200)
+    tracker.refresh(full=True)
+    assert tracker.storage.get_task("a")["Threshold"] == 190
+
+    with contextlib.redirect_stdout(io.StringIO()) as output:
+        tracker.refresh(full=True)
+    assert "0 updated" in output.getvalue()
+
+
+def test_backdated_session_keeps_latest_day(quiet):
+    client = FakeFirestore()
+    tracker = make_tracker(client)
+    tracker.create_task("a", 100)
+    tracker.record_session("a", [80, 90], 0.5, "2026-10-17")
+    tracker.record_session("a", [70], 0.3, "2026-09-01")
+    tracker.record_session("a", [95], None, "2026-10-17")
+
+    task = tracker.storage.get_task("a")
+    assert task["Date"] == "2026-10-17"
+    assert task["Sensitivity"] == 0.5
+    assert task["Avg_Daily"] == pytest.approx(265 / 3)
+    assert task["Repetitions"] == 4
+    assert tracker.storage.get_rollups_many([("a", "2026-09-01")])[("a", "2026-09-01")]["Count"] == 1
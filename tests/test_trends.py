@@ -0,0 +1,64 @@
+import random
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+from trends import TrendModel, ols_slopes, theil_sen_slopes
+
+TODAY = date(2024, 6, 30)
+
+
+def test_slopes_on_a_line():
+    y = np.array([[3.0, 5.0, 7.0, 9.0], [np.nan, 1.0, 1.0, 1.0]])
+    slope, intercept = ols_slopes(y)
+    assert np.allclose(slope, [2, 0]) and np.allclose(intercept, [3, 1])
+    assert np.allclose(theil_sen_slopes(np.array([[0.0, 1.0, 2.0, 100.0, 4.0]])), [1])
+
+
+def model_for(series):
+    model = TrendModel()
+    for task, scores in series.items():
+        for index in range(0, len(scores), 5):
+            day = (TODAY - timedelta(days=(len(scores) - 1) // 5 - index // 5)).isoformat()
+            model.extend(task, scores[index:index + 5], day)
+    return model
+
+
+def test_status_flags_on_synthetic_series():
+    rng = random.Random(0)
+    table = model_for({
+        "improving": [500 + 4 * index + rng.uniform(-5, 5) for index in range(50)],
+        "plateau": [500 + rng.uniform(-2, 2) for _ in range(50)],
+        "regressing": [700 - 4 * index + rng.uniform(-5, 5) for index in range(50)],
+        "new": [500, 510, 520],
+    }).table(today=TODAY)
+
+    assert table.loc["improving", "status"] == "improving"
+    assert table.loc["improving", "per_day"] > 0
+    assert table.loc["plateau", "status"] == "plateau"
+    assert abs(table.loc["plateau", "robust_change"]) < 0.01
+    assert table.loc["regressing", "status"] == "regressing"
+    assert pd.isna(table.loc["regressing", "next_pr"])
+    assert table.loc["new", "status"] == "insufficient data"
+    assert table.loc["new", "reps"] == 3
+
+
+def test_next_pr_for_steady_improvement():
+    scores = [500 + 2 * index for index in range(50)]
+    model = model_for({"a": scores})
+    model.best["a"] = scores[-1] + 100
+    row = model.table(today=TODAY).loc["a"]
+    assert row["status"] == "improving"
+    assert row["next_pr"] is not None and row["next_pr"] > TODAY.isoformat()
+
+    model.extend("a", [600], TODAY.isoformat())
+    assert model.dirty == {"a"}
+    assert model.table(today=TODAY).loc["a", "reps"] == 51
+
+
+def test_sessions_after_today_are_ignored_for_daily_trend():
+    model = TrendModel()
+    model.extend("a", [500] * 20, TODAY.isoformat())
+    model.extend("a", [900], (TODAY + timedelta(days=1)).isoformat())
+    assert model.table(today=TODAY).loc["a", "reps"] == 21
@@ -0,0 +1,89 @@
+import contextlib
+import io
+import os
+import time
+
+import pytest
+
+import importer
+from storage import SqliteStorage
+from tracker import Tracker
+from watcher import StatsWatcher
+
+from tests.test_importer import write_run
+
+
+class FailingStorage:
+    def __init__(self, storage):
+        self.storage = storage
+        self.failures = []
+
+    def transact_task(self, name, build):
+        if name in self.failures:
+            self.failures.remove(name)
+            raise ConnectionError("offline")
+        return self.storage.transact_task(name, build)
+
+    def __getattr__(self, name):
+        return getattr(self.storage, name)
+
+
+@pytest.fixture
+def watcher(tmp_path):
+    stats = tmp_path / "stats"
+    stats.mkdir()
+    storage = FailingStorage(SqliteStorage(str(tmp_path / "tracker.db")))
+    tracker = Tracker(storage)
+    with contextlib.redirect_stdout(io.StringIO()):
+        tracker.create_task("a", 100)
+        tracker.create_task("b", 100)
+    return StatsWatcher(tracker, str(stats), str(tmp_path / "state.json"), use_inotify=False), storage
+
+
+def test_failed_flush_keeps_files_and_does_not_double_count(watcher):
+    watcher, storage = watcher
+    now = time.time()
+    paths = [os.path.join(watcher.directory, write_run(watcher.directory, "a", "2024.01.01-10.00.00", 90, now)),
+             os.path.join(watcher.directory, write_run(watcher.directory, "b", "2024.01.01-11.00.00", 80, now))]
+    watcher.ready = [(path, now) for path in paths]
+    storage.failures = ["b"]
+
+    with pytest.raises(ConnectionError):
+        watcher.flush()
+    assert len(watcher.ready) == 2
+    assert list(importer.load_state(watcher.state_path)["files"]) == [os.path.basename(paths[0])]
+
+    summary = watcher.flush()
+    assert summary["duplicates"] == 1 and summary["runs"] == 1
+    assert watcher.ready == []
+    assert storage.get_task("a")["Repetitions"] == 1
+    assert storage.get_task("b")["Repetitions"] == 1
+
+
+def test_run_backs_off_and_keeps_going(watcher, monkeypatch):
+    watcher, _ = watcher
+    steps = [ConnectionError("offline"), ConnectionError("offline"), None, KeyboardInterrupt()]
+    sleeps = []
+
+    def step():
+        result = steps.pop(0)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    monkeypatch.setattr(watcher, "step", step)
+    monkeypatch.setattr(time, "sleep", sleeps.append)
+    reports = []
+    watcher.run(report=reports.append)
+    assert sleeps == [5.0, 10.0]
+    assert sum("retrying" in report for report in reports) == 2
+
+
+def test_flush_prunes_files_below_the_high_water_mark(watcher):
+    watcher, _ = watcher
+    old = write_run(watcher.directory, "a", "2024.01.01-10.00.00", 90, 100)
+    watcher.state["files"] = {old: "hash", "deleted Stats.csv": "hash"}
+    path = os.path.join(watcher.directory, write_run(watcher.directory, "b", "2024.01.01-11.00.00", 80, 200))
+    watcher.ready = [(path, 200)]
+    watcher.flush()
+    assert watcher.state["files"] == {os.path.basename(path): importer.parse_stats_file(path)["hash"]}
@@ -0,0 +1,24 @@
+import time
+from contextlib import contextmanager
+
+START = time.perf_counter()
+TIMINGS = []
+
+
+@contextmanager
+def timed(label):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        TIMINGS.append((label, time.perf_counter() - start))
+
+
+def mark(label):
+    TIMINGS.append((label, time.perf_counter() - START))
+
+
+def print_report():
+    print("\nTiming:")
+    for label, seconds in TIMINGS:
+        print(f"{label:<30} {seconds * 1000:>9.1f} ms")
@@ -1,15 +1,21 @@
-import pandas as pd
-import firebase_admin
-from firebase_admin import credentials, firestore
-from google.cloud.firestore import ArrayUnion
+import timing
 from datetime import datetime, timedelta
+import math
 import os
 import platform
+import uuid
 import warnings
+from aggregates import RunningAggregate
+from cache import CachedStorage
+import importer
+from watcher import StatsWatcher
+from rollups import bucket_keys, build_rollups, rollup_writes
+from storage import DELETE_FIELD, TASK_FIELDS, Write, apply_fields, content_hash, get_storage, new_task
+from summaries import PlaylistSummaries
 
-cred = credentials.Certificate("cred.json")
-firebase_admin.initialize_app(cred)
-db = firestore.client()
+SESSIONS_PER_TRANSACTION = 80
+
+timing.mark("import tracker")
 
 
 def clear_console():
@@ -20,119 +26,119 @@ def clear_console():
         os.system('clear')
 
 
+def print_progress(done, total, unit="documents written"):
+    print(f"\r{done}/{total} {unit}", end="\n" if done == total else "", flush=True)
+
+
 class Tracker:
-    def __init__(self):
+    def __init__(self, storage=None):
+        storage = storage or get_storage()
+        self.storage = storage if getattr(storage, "live", False) else CachedStorage(storage)
         self.current_playlist = None
         self.current_task = None
-        self.df = pd.DataFrame(columns=["Date", "Tasks", "Scores", "Sensitivity", "Repetitions", "Old_Highscore", "Highscore", "Avg_Daily", "Avg_10", "Threshold", "Threshold_Achieved"])
+        self._session_table = None
+        self._rolling = None
+        self._trends = None
+        self.summaries = PlaylistSummaries(self.storage)
+
+    @property
+    def session_table(self):
+        if self._session_table is None:
+            from session_table import SessionTable
+
+            self._session_table = SessionTable()
+        return self._session_table
 
-    def create_task(self):
-        task_name = input("Enter task name: ")
+    def create_task(self, task_name=None, highscore=None):
+        if task_name is None:
+            task_name = input("Enter task name: ")
 
-        while True:
+        while highscore is None:
             try:
                 highscore = int(input(f"Enter initial highscore for task {task_name}: "))
                 if highscore <= 0:
                     raise ValueError("Highscore must be a positive integer.")
-                break
             except ValueError:
+                highscore = None
                 print("Invalid input. Please enter a valid positive integer for the initial highscore.")
 
-        threshold = round(0.9 * highscore, 2)
-
-        task_data = {
-            "Date": "",
-            "Tasks": task_name,
-            "Scores": [],
-            "Sensitivity": None,
-            "Repetitions": 0,
-            "Old_Highscore": None,
-            "Highscore": highscore,
-            "Avg_Daily": None,
-            "Avg_10": None,
-            "Threshold": threshold,
-            "Threshold_Achieved": None
-        }
-
-        db.collection("tasks").document(task_name).set(task_data)
+        self.storage.set_task(task_name, new_task(task_name, highscore))
         print(f"Task '{task_name}' created successfully.")
 
-    def edit_task(self, task_name):
-        while True:
+    def edit_task(self, task_name, new_highscore=None):
+        while new_highscore is None:
             try:
                 new_highscore = int(input(f"Enter new highscore for task {task_name}: "))
                 if new_highscore <= 0:
                     raise ValueError("Highscore must be a positive integer.")
-                break
             except ValueError:
+                new_highscore = None
                 print("Invalid input. Please enter a valid positive integer for the new highscore.")
 
         new_threshold = round(0.95 * new_highscore, 2)
 
-        db.collection("tasks").document(task_name).update({
+        self.storage.update_task(task_name, {
             "Highscore": new_highscore,
             "Threshold": new_threshold,
         })
+        self.summaries.invalidate_task(task_name)
         print(f"Task '{task_name}' edited successfully.")
 
     def delete_task(self, task_name):
-        task_ref = db.collection("tasks").document(task_name)
-        if task_ref.get().exists:
-            task_ref.delete()
+        self.summaries.invalidate_task(task_name)
+        if self.storage.delete_task(task_name):
             print(f"Task '{task_name}' deleted successfully.")
         else:
             print(f"Task '{task_name}' does not exist.")
 
     def delete_all_tasks(self):
-        tasks = db.collection("tasks").get()
-        for task in tasks:
-            db.collection("tasks").document(task.id).delete()
+        self.storage.delete_all_tasks(progress=print_progress)
+        self.summaries.clear()
         print("All tasks deleted successfully.")
 
     def view_all_tasks(self):
-        tasks = db.collection("tasks").get()
+        tasks = self.storage.task_names()
         if not tasks:
             print("No tasks found.")
         else:
             print("All Tasks:")
-            for task in tasks:
-                task_name = task.id
+            for task_name in tasks:
                 print(f"- {task_name}")
 
     def get_all_tasks(self):
-        tasks = db.collection("tasks").get()
-        return [task.id for task in tasks]
+        return self.storage.task_names()
 
-    def create_playlist(self):
-        playlist_name = input("Enter playlist name: ")
+    def create_playlist(self, playlist_name=None, task_names=None):
+        if playlist_name is None:
+            playlist_name = input("Enter playlist name: ")
 
         all_tasks = self.get_all_tasks()
-        self.view_all_tasks()
-
-        selected_tasks_input = input("Enter task names (comma-separated) for the playlist: ")
-        selected_tasks = [task.strip() for task in selected_tasks_input.split(',') if task.strip() in all_tasks]
+        if task_names is None:
+            self.view_all_tasks()
+            selected_tasks_input = input("Enter task names (comma-separated) for the playlist: ")
+            task_names = selected_tasks_input.split(',')
+        selected_tasks = [task.strip() for task in task_names if task.strip() in all_tasks]
 
         playlist_data = {"playlist_name": playlist_name, "tasks": selected_tasks}
-        db.collection("playlists").document(playlist_name).set(playlist_data)
+        self.storage.set_playlist(playlist_name, playlist_data)
+        self.summaries.invalidate(playlist_name)
         print(f"Playlist '{playlist_name}' created successfully with tasks: {', '.join(selected_tasks)}.")
 
     def edit_playlist(self, playlist_name):
         new_playlist_name = input(
             f"Enter new name for playlist {playlist_name} (press Enter to keep the current name): ")
 
-        existing_playlist = db.collection("playlists").document(playlist_name).get()
-        if existing_playlist.exists:
-            existing_tasks = existing_playlist.to_dict().get("tasks", [])
+        existing_playlist = self.storage.get_playlist(playlist_name)
+        if existing_playlist is not None:
+            existing_tasks = existing_playlist.get("tasks", [])
         else:
             existing_tasks = []
 
         if new_playlist_name.strip():
-            db.collection("playlists").document(new_playlist_name).set({"tasks": existing_tasks})
+            self.storage.set_playlist(new_playlist_name, {"tasks": existing_tasks})
             print(f"Playlist '{new_playlist_name}' created successfully.")
 
-            playlist_ref = db.collection("playlists").document(playlist_name)
-            if playlist_ref.get().exists:
-                playlist_ref.delete()
+            if self.storage.delete_playlist(playlist_name):
                 print(f"Old playlist '{playlist_name}' deleted successfully.")
             else:
                 print(f"Old playlist '{playlist_name}' does not exist.")
@@ -142,65 +148,77 @@ class Tracker:
         self.view_all_tasks()
         selected_tasks_input = input(
             "Enter updated task names (comma-separated) for the playlist or press Enter to skip: ")
-        selected_tasks = [task.strip() for task in selected_tasks_input.split(',') if
-                          task.strip() in self.df["Tasks"].unique()]
+        all_tasks = set(self.get_all_tasks())
+        selected_tasks = [task.strip() for task in selected_tasks_input.split(',') if task.strip() in all_tasks]
 
         selected_tasks = selected_tasks or existing_tasks
 
-        db.collection("playlists").document(new_playlist_name).update({"tasks": selected_tasks})
+        self.storage.update_playlist(new_playlist_name, {"tasks": selected_tasks})
+        self.summaries.invalidate(playlist_name, new_playlist_name)
         print(f"Playlist '{new_playlist_name}' edited successfully with updated tasks: {', '.join(selected_tasks)}.")
 
     def delete_playlist(self, playlist_name):
-        playlist_ref = db.collection("playlists").document(playlist_name)
-        if playlist_ref.get().exists:
-            playlist_ref.delete()
+        self.summaries.invalidate(playlist_name)
+        if self.storage.delete_playlist(playlist_name):
             print(f"Playlist '{playlist_name}' deleted successfully.")
         else:
             print(f"Playlist '{playlist_name}' does not exist.")
 
     def delete_all_playlists(self):
-        playlists = db.collection("playlists").get()
-        for playlist in playlists:
-            db.collection("playlists").document(playlist.id).delete()
+        self.storage.delete_all_playlists(progress=print_progress)
+        self.summaries.clear()
         print("All playlists deleted successfully.")
 
     def view_playlists(self):
-        playlists = db.collection("playlists").get()
+        playlists = self.storage.list_playlists(fields=["tasks"])
         if not playlists:
             print("No playlists found.")
         else:
             print("All Playlists:")
-            for playlist in playlists:
-                playlist_data = playlist.to_dict()
-                playlist_name = playlist.id
+            for playlist_name, playlist_data in playlists:
                 tasks = playlist_data.get("tasks", [])
                 tasks_str = ", ".join(tasks) if tasks else "No tasks"
                 print(f"- {playlist_name}: {tasks_str}")
 
     def view_tasks_playlist(self, playlist_name):
-        playlist_ref = db.collection("playlists").document(playlist_name)
-        playlist_data = playlist_ref.get().to_dict()
+        playlist_data = self.storage.get_playlist(playlist_name)
         if playlist_data:
             tasks = playlist_data.get("tasks", [])
             print(f"Tasks in Playlist '{playlist_name}': {', '.join(tasks)}")
         else:
             print(f"Playlist '{playlist_name}' does not exist.")
 
+    def view_playlist_summary(self, playlist_name):
+        summary = self.summaries.get(playlist_name)
+        if summary is None:
+            print(f"Playlist '{playlist_name}' does not exist.")
+            return
+        if not summary["tasks"]:
+            print(f"No tasks found in the playlist '{playlist_name}'.")
+            return
+
+        completion = ", ".join(f"{period} {done}/{total}" for period, (done, total) in summary["completion"].items())
+        print(f"\nPlaylist '{playlist_name}': score {summary['score']}% ({completion})")
+        print("{:<20} {:<12} {:<10} {:<10} {:<12} {:<10}".format(
+            "Task", "Highscore", "Avg 10", "% of HS", "Threshold", "Reps today"))
+        for task_name, highscore, average, percent, status, reps in summary["tasks"]:
+            print("{:<20} {:<12} {:<10} {:<10} {:<12} {:<10}".format(
+                task_name, "N/A" if highscore is None else highscore, "N/A" if average is None else round(average, 2),
+                "N/A" if percent is None else f"{percent}%", status, reps))
+
     def choose_playlist(self):
-        playlists = db.collection("playlists").get()
+        playlists = self.storage.playlist_names()
         if not playlists:
             print("No playlists found.")
             return
 
         print("Select a playlist:")
-        for idx, playlist in enumerate(playlists):
-            playlist_name = playlist.id
+        for idx, playlist_name in enumerate(playlists):
             print(f"{idx + 1}. {playlist_name}")
 
         try:
             selected_index = int(input("Enter the number of the playlist: ")) - 1
-            selected_playlist = playlists[selected_index]
-            playlist_name = selected_playlist.id
+            playlist_name = playlists[selected_index]
             self.current_playlist = playlist_name
             print(f"Playlist '{playlist_name}' selected.")
         except (ValueError, IndexError):
@@ -211,8 +229,7 @@ class Tracker:
             print("Error: Please choose a playlist first.")
             return
 
-        playlist_ref = db.collection("playlists").document(self.current_playlist)
-        playlist_data = playlist_ref.get().to_dict()
+        playlist_data = self.storage.get_playlist(self.current_playlist)
 
         if playlist_data:
             tasks = playlist_data.get("tasks", [])
@@ -246,125 +263,426 @@ class Tracker:
             score = int(input(f"Enter score for repetition {rep + 1}: "))
             scores.append(score)
 
-        date_today = datetime.now().strftime("%Y-%m-%d")
-
-        existing_entry = self.df[
-            (self.df["Tasks"].str.lower() == self.current_task.lower()) &
-            (self.df["Date"] == date_today.lower())
-            ]
-
-        if not existing_entry.empty:
-            repetitions += existing_entry["Repetitions"].values[0]
-            scores += existing_entry["Scores"].values[0]
-
-        task_ref = db.collection("tasks").document(self.current_task)
-        existing_task_data = task_ref.get().to_dict()
+        self.record_session(self.current_task, scores, sensitivity)
+        print("Task data updated successfully.")
 
-        old_highscore = existing_task_data.get("Highscore", 0)
+    def record_session(self, task_name, scores, sensitivity, date=None, session_id=None):
+        if not scores:
+            print("No scores to record.")
+            return None
 
-        print(old_highscore)
+        def build(existing_task_data):
+            if not existing_task_data:
+                return [], None
+            return self.session_writes(task_name, existing_task_data, scores, sensitivity, date, session_id)
 
-        highscore = max(scores)
-        avg_daily = sum(scores) / repetitions
-        avg_10 = sum(scores[-10:]) / min(10, repetitions)
+        updated_task_data = self.storage.transact_task(task_name, build)
+        if updated_task_data is None:
+            print(f"No data found for the task '{task_name}'.")
+        else:
+            self._track_reps(task_name, scores, date, sensitivity, updated_task_data["Threshold"])
+        return updated_task_data
+
+    def record_sessions(self, sessions, progress=None, committed=None):
+        sessions = list(sessions)
+        by_task = {}
+        skipped = []
+        for task_name, scores, sensitivity, date, session_id in sessions:
+            if scores:
+                by_task.setdefault(task_name, []).append((scores, sensitivity, date, session_id))
+            else:
+                skipped.append(task_name)
+
+        written = done = 0
+        total = sum(len(task_sessions) for task_sessions in by_task.values())
+        for task_name, task_sessions in by_task.items():
+            for start in range(0, len(task_sessions), SESSIONS_PER_TRANSACTION):
+                batch = task_sessions[start:start + SESSIONS_PER_TRANSACTION]
+
+                thresholds = []
+
+                def build(existing_task_data, task_name=task_name, batch=batch, thresholds=thresholds):
+                    if not existing_task_data:
+                        return [], None
+                    writes = []
+                    first_update = task_update = None
+                    thresholds.clear()
+                    for scores, sensitivity, date, session_id in batch:
+                        session_writes, updated = self.session_writes(task_name, existing_task_data, scores,
+                                                                      sensitivity, date, session_id)
+                        thresholds.append(updated["Threshold"])
+                        for write in session_writes:
+                            if write.collection == "tasks":
+                                existing_task_data = apply_fields(existing_task_data, write.data)
+                                first_update = first_update or write
+                                task_update = write
+                            else:
+                                writes.append(write)
+                    writes.append(task_update._replace(data=dict(first_update.data, **task_update.data)))
+                    return writes, len(writes)
+
+                count = self.storage.transact_task(task_name, build)
+                if count is None:
+                    skipped.append(task_name)
+                    done += len(task_sessions) - start
+                    if progress:
+                        progress(done, total)
+                    break
+                done += len(batch)
+                written += count
+                if committed:
+                    committed(task_name, batch)
+                for (scores, sensitivity, date, _), threshold in zip(batch, thresholds):
+                    self._track_reps(task_name, scores, date, sensitivity, threshold)
+                if progress:
+                    progress(done, total)
+        return written, skipped
+
+    def session_writes(self, task_name, existing_task_data, scores, sensitivity, date=None, session_id=None):
+        now = datetime.now()
+        date_today = date or now.strftime("%Y-%m-%d")
+        session_id = session_id or f"{date_today}_{now.strftime('%H%M%S%f')}_{uuid.uuid4().hex[:8]}"
+
+        old_highscore = existing_task_data.get("Highscore") or 0
+
+        session_best = max(scores)
+        highscore = max(session_best, old_highscore)
 
         if old_highscore != 0:
             threshold = round(0.9 * old_highscore, 2)
         else:
             threshold = round(0.9 * highscore, 2)
-        print(threshold)
-        threshold_achieved = highscore >= threshold if threshold else None
+        threshold_achieved = session_best >= threshold if threshold else None
 
-        task_data = {
+        session_data = {
             "Date": date_today,
-            "Tasks": self.current_task,
-            "Scores": scores,
+            "Session": session_id,
+            "Scores": list(scores),
+            "Sensitivity": sensitivity,
+            "Repetitions": len(scores),
+            "Threshold": threshold,
+        }
+
+        writes = [Write("set", "sessions", (task_name, session_id), session_data)]
+        legacy_scores = existing_task_data.get("Scores")
+        if legacy_scores:
+            legacy_date = existing_task_data.get("Date") or date_today
+            writes.append(Write("set", "sessions", (task_name, f"{legacy_date}_legacy"), {
+                "Date": legacy_date,
+                "Session": f"{legacy_date}_legacy",
+                "Scores": legacy_scores,
+                "Sensitivity": existing_task_data.get("Sensitivity"),
+                "Repetitions": len(legacy_scores),
+            }))
+
+        if "Stats" in existing_task_data:
+            stats = RunningAggregate.from_dict(existing_task_data["Stats"])
+        else:
+            stats = RunningAggregate.from_scores(legacy_scores or [])
+            for _, past_session in self.storage.get_sessions(task_name):
+                stats.add(past_session.get("Scores", []), past_session.get("Date"))
+        stats.add(scores, date_today)
+
+        avg_daily = stats.day_mean()
+        avg_10 = stats.recent_mean()
+
+        task_date = max(date_today, existing_task_data.get("Date") or "")
+        if task_date != date_today:
+            sensitivity = existing_task_data.get("Sensitivity")
+            avg_daily = existing_task_data.get("Avg_Daily")
+            threshold_achieved = existing_task_data.get("Threshold_Achieved")
+        elif sensitivity is None:
+            sensitivity = existing_task_data.get("Sensitivity")
+
+        updated_task_data = {
+            "Date": task_date,
+            "Tasks": task_name,
             "Sensitivity": sensitivity,
-            "Repetitions": repetitions,
-            "Old_Highscore": old_highscore,
+            "Repetitions": stats.count,
+            "Old_Highscore": old_highscore if highscore > old_highscore else None,
             "Highscore": highscore,
             "Avg_Daily": avg_daily,
             "Avg_10": avg_10,
             "Threshold": threshold,
-            "Threshold_Achieved": threshold_achieved
+            "Threshold_Achieved": threshold_achieved,
+            "Stats": stats.to_dict(),
         }
+        task_fields = dict(updated_task_data, Version=(existing_task_data.get("Version") or 0) + 1, Dirty=True)
+        if "Scores" in existing_task_data:
+            task_fields["Scores"] = DELETE_FIELD
 
-        task_index = self.df.index[
-            (self.df["Tasks"].str.lower() == self.current_task.lower()) &
-            (self.df["Date"] == date_today.lower())
-            ].tolist()
-
-        if task_index:
-            task_index = task_index[0]
-            for key, value in task_data.items():
-                self.df.at[task_index, key] = value
-
-        task_ref = db.collection("tasks").document(self.current_task)
-        existing_task_data = task_ref.get().to_dict()
-
-        if existing_task_data:
-            existing_scores = existing_task_data.get("Scores", [])
-            existing_repetitions = existing_task_data.get("Repetitions", 0)
-
-            updated_scores = existing_scores + scores
-            updated_repetitions = existing_repetitions + repetitions
-
-            updated_task_data = {
-                "Date": date_today,
-                "Tasks": self.current_task,
-                "Scores": updated_scores,
-                "Sensitivity": sensitivity,
-                "Repetitions": updated_repetitions,
-                "Old_Highscore": old_highscore if highscore > old_highscore else None,
-                "Highscore": highscore,
-                "Avg_Daily": avg_daily,
-                "Avg_10": avg_10,
-                "Threshold": threshold,
-                "Threshold_Achieved": threshold_achieved
-            }
-
-            task_ref.update(updated_task_data)
-
-        print("Task data updated successfully.")
+        writes.append(Write("update", "tasks", task_name, task_fields))
+        writes += rollup_writes(task_name, date_today, scores, threshold)
+        return writes, updated_task_data
 
     def view_task_data(self):
         if not self.current_task:
             print("Error: Please choose a task first.")
             return
 
-        db = firestore.client()
-        task_ref = db.collection("tasks").document(self.current_task)
-        task_data = task_ref.get().to_dict()
+        task_data = self.storage.get_task(self.current_task)
 
         if task_data:
             print("\nTask Data:")
 
-            fields_order = ["Date", "Tasks", "Sensitivity", "Repetitions", "Old_Highscore", "Highscore", "Avg_Daily",
-                            "Avg_10", "Threshold", "Threshold_Achieved"]
-
             date_format = "{:<20}"
-            headers = [date_format.format("Date")] + ["{:<15}".format(header) for header in fields_order[1:] if
-                                                      header != "Scores"]
+            headers = [date_format.format("Date")] + ["{:<15}".format(header) for header in TASK_FIELDS[1:]]
             print(" ".join(headers))
-            date_str = date_format.format(task_data["Date"])
-            data_str = " ".join(
-                ["{:<15}".format(str(task_data[header])) for header in fields_order[1:] if header != "Scores"])
+            date_str = date_format.format(task_data.get("Date") or "")
+            data_str = " ".join(["{:<15}".format(str(task_data.get(header))) for header in TASK_FIELDS[1:]])
             print(date_str + " " + data_str)
         else:
             print(f"No data found for the task '{self.current_task}'.")
 
+    def view_task_history(self, task_name=None):
+        task_name = task_name or self.current_task
+        if not task_name:
+            print("Error: Please choose a task first.")
+            return
+
+        if not self.session_table.has_task(task_name):
+            with timing.timed("load session table"):
+                self.session_table.load(self.storage, [task_name])
+        days = self.session_table.days(task_name)
+        if not days:
+            print(f"No sessions found for the task '{task_name}'.")
+            return
+
+        print("\n{:<12} {:<12} {:<12} {:<12} {:<12} {:<12} {:<12} {:<10}".format(
+            "Date", "Repetitions", "Sensitivity", "Highscore", "Avg_Daily", "Avg_10", "Threshold", "Achieved"))
+        for day in days:
+            print("{:<12} {:<12} {:<12} {:<12} {:<12} {:<12} {:<12} {:<10}".format(
+                day["Date"], day["Repetitions"], str(day["Sensitivity"]), day["Highscore"],
+                round(day["Avg_Daily"], 2), round(day["Avg_10"], 2), day["Threshold"],
+                str(day["Threshold_Achieved"])))
+
+    def view_data(self, time_period):
+        if time_period == "all":
+            rows = []
+            for task_name, task_data in self.storage.list_tasks(fields=["Stats"]):
+                stats = RunningAggregate.from_dict(task_data.get("Stats"))
+                rows.append((task_name, stats.count, stats.mean(), stats.best, None))
+        else:
+            bucket = bucket_keys(datetime.now().date())[time_period]
+            rows = [(task_name, rollup["Count"], rollup["Sum"] / rollup["Count"] if rollup["Count"] else None,
+                     rollup["Max"], rollup.get("Threshold_Hits"))
+                    for task_name, rollup in self.storage.get_rollups(bucket)]
+
+        rows = [row for row in rows if row[1]]
+        if not rows:
+            print(f"No data available for {time_period}.")
+            return
+
+        print("\n{:<20} {:<15} {:<15} {:<15} {:<15}".format(
+            "Task", "Repetitions", f"Avg {time_period.capitalize()}", "Max", "Threshold Hits"))
+        for task_name, count, average, best, hits in rows:
+            print("{:<20} {:<15} {:<15} {:<15} {:<15}".format(
+                task_name, count, round(average, 2), str(best), "N/A" if hits is None else hits))
+
+    def _track_reps(self, task_name, scores, date=None, sensitivity=None, threshold=None):
+        date = date or datetime.now().strftime("%Y-%m-%d")
+        self.summaries.invalidate_task(task_name)
+        if self._session_table is not None and self._session_table.has_task(task_name):
+            self._session_table.record(task_name, date, scores, sensitivity, threshold)
+        if self._rolling is not None:
+            self._rolling.extend(task_name, scores)
+        if self._trends is not None:
+            self._trends.extend(task_name, scores, date)
+
+    @property
+    def rolling(self):
+        if self._rolling is None:
+            with timing.timed("load rolling stats"):
+                from rolling import RollingStats
+
+                self._rolling = RollingStats.from_sessions(self.storage.get_sessions_many(self.storage.task_names()))
+        return self._rolling
+
+    def view_rolling_stats(self, task_names=None):
+        table = self.rolling.table(task_names)
+        table = table[table["reps"] > 0]
+        if table.empty:
+            print("No scores recorded yet.")
+            return
+
+        print("\n{:<20} {:<8} {:<10} {:<10} {:<10} {:<10} {:<10} {:<12}".format(
+            "Task", "Reps", "EWMA", "Median", "P10", "P90", "Std", "Consistency"))
+        for task_name, row in table.iterrows():
+            print("{:<20} {:<8} {:<10} {:<10} {:<10} {:<10} {:<10} {:<12}".format(
+                task_name, int(row["reps"]), row["ewma"], row["median"], row["p10"], row["p90"], row["std"],
+                row["consistency"]))
+
+    @property
+    def trends(self):
+        if self._trends is None:
+            with timing.timed("load trends"):
+                from trends import TrendModel
+
+                self._trends = TrendModel.from_sessions(self.storage.get_sessions_many(self.storage.task_names()))
+        return self._trends
+
+    def view_trends(self, task_names=None):
+        table = self.trends.table(task_names)
+        table = table[table["reps"] > 0]
+        if table.empty:
+            print("No scores recorded yet.")
+            return
+
+        print("\n{:<20} {:<8} {:<10} {:<18} {:<12} {:<12}".format(
+            "Task", "Reps", "Level", "Status", "Change", "Next PR"))
+        for task_name, row in table.iterrows():
+            change = "N/A" if math.isnan(row["robust_change"]) else f"{row['robust_change'] * 100:+.1f}%"
+            print("{:<20} {:<8} {:<10} {:<18} {:<12} {:<12}".format(
+                task_name, int(row["reps"]), row["level"], row["status"], change,
+                row["next_pr"] if isinstance(row["next_pr"], str) else "N/A"))
+
+    def refresh(self, full=False):
+        tasks = self.storage.list_tasks() if full else self.storage.dirty_tasks()
+        if not tasks:
+            print("Nothing to refresh.")
+            return
+        all_sessions = self.storage.get_sessions_many([task_name for task_name, _ in tasks])
+
+        updated = unchanged = conflicts = 0
+        for task_name, task_data in tasks:
+            stats = RunningAggregate.from_scores(task_data.get("Scores") or [])
+            for _, session in all_sessions[task_name]:
+                stats.add(session.get("Scores", []), session.get("Date"))
+            fields = {}
+            if stats.count:
+                highscore = max(stats.best, task_data.get("Highscore") or 0)
+                fields = {
+                    "Repetitions": stats.count,
+                    "Highscore": highscore,
+                    "Avg_Daily": stats.day_mean(),
+                    "Avg_10": stats.recent_mean(),
+                    "Stats": stats.to_dict(),
+                }
+                if content_hash(fields) == content_hash({key: task_data.get(key) for key in fields}):
+                    fields = {}
+            if task_data.get("Dirty"):
+                fields["Dirty"] = DELETE_FIELD
+            if not fields:
+                unchanged += 1
+                continue
+
+            def build(current, version=task_data.get("Version"), fields=fields, task_name=task_name):
+                if not current or current.get("Version") != version:
+                    return [], False
+                return [Write("update", "tasks", task_name, fields)], True
+
+            if not self.storage.transact_task(task_name, build):
+                conflicts += 1
+            elif list(fields) == ["Dirty"]:
+                unchanged += 1
+            else:
+                updated += 1
+                self.summaries.invalidate_task(task_name)
+
+        print(f"Data refreshed successfully ({updated} updated, {unchanged} unchanged"
+              f"{f', {conflicts} changed during refresh and left for next time' if conflicts else ''}).")
+
+    def view_cache_stats(self):
+        stats = self.storage.stats()
+        print("\nLive model:" if getattr(self.storage, "live", False) else "\nCache:")
+        for key, value in stats.items():
+            print(f"{key:<10} {value}")
+
+    def import_stats(self, directory, full=False):
+        if not os.path.isdir(directory):
+            print(f"Stats folder '{directory}' does not exist.")
+            return
+        summary = importer.import_stats(self, directory, full=full,
+                                        progress=lambda done, total: print_progress(done, total, "sessions recorded"))
+        print(f"Imported {summary['runs']} runs into {summary['sessions']} sessions "
+              f"({summary['duplicates']} duplicates skipped).")
+        if summary["unmatched"]:
+            print(f"No task found for scenarios: {', '.join(summary['unmatched'])}")
+
+    def watch_stats(self, directory):
+        if not os.path.isdir(directory):
+            print(f"Stats folder '{directory}' does not exist.")
+            return
+        StatsWatcher(self, directory).run()
+
+    def migrate_legacy(self, checkpoint_path="migration_state.json", page_size=None, workers=None, restart=False,
+                       delete_source=False):
+        import migrate
+        from storage import PAGE_SIZE, firestore_client
+
+        db = firestore_client(os.environ.get("TRACKER_CRED", "cred.json"))
+        state = migrate.migrate(self, db, checkpoint_path, page_size or PAGE_SIZE, workers or migrate.WORKERS,
+                                restart, progress=lambda done: print(f"\r{done} task documents migrated", end="",
+                                                                     flush=True))
+        print()
+        verified = state.get("verified") or {}
+        print(f"Migrated {state['documents']} task documents into {verified.get('tasks', 0)} tasks and "
+              f"{state['playlists']} playlists ({verified.get('reps', 0)} reps, {state['skipped']} documents skipped).")
+        if verified.get("mismatches"):
+            print(f"Counts or totals differ for: {', '.join(verified['mismatches'])}. "
+                  f"Run the migration again to retry; '{checkpoint_path}' keeps its progress.")
+        elif delete_source:
+            print(f"Deleted {migrate.delete_source(db, page_size or PAGE_SIZE)} legacy task documents.")
+
+    def backfill_rollups(self):
+        writes = []
+        tasks = self.storage.list_tasks(fields=["Date", "Scores", "Threshold"])
+        all_sessions = self.storage.get_sessions_many([task_name for task_name, _ in tasks])
+        for task_name, task_data in tasks:
+            sessions = list(all_sessions[task_name])
+            if task_data.get("Scores"):
+                legacy_date = task_data.get("Date") or datetime.now().strftime("%Y-%m-%d")
+                sessions.append((f"{legacy_date}_legacy", {"Date": legacy_date, "Scores": task_data["Scores"]}))
+            writes += build_rollups(task_name, sessions, task_data.get("Threshold"))
+        self.storage.commit(writes, progress=print_progress)
+        self.summaries.clear()
+        print(f"Rollups rebuilt ({len(writes)} documents).")
+
 
 if __name__ == "__main__":
-    tracker = Tracker()
+    import atexit
+    import sys
+    import cli
+
+    args = cli.build_parser().parse_args()
+    if args.timing:
+        atexit.register(timing.print_report)
+
+    storage = get_storage(args.storage)
+    if args.profile or args.metrics_out:
+        import metrics
+
+        storage = metrics.MeteredStorage(storage)
+        if args.profile:
+            atexit.register(metrics.METRICS.print_report)
+        if args.metrics_out:
+            atexit.register(metrics.METRICS.export, args.metrics_out)
+
+    if args.queue:
+        from outbox import QueuedStorage
+
+        storage = QueuedStorage(storage, os.environ.get("TRACKER_OUTBOX", "outbox.db"))
+
+        def close_outbox(outbox=storage):
+            remaining = outbox.close()
+            if remaining:
+                print(f"{remaining} queued writes could not be sent; they will be retried on the next start.")
+
+        atexit.register(close_outbox)
+
+    tracker = Tracker(storage)
+    timing.mark("startup")
+    if args.command:
+        sys.exit(cli.run(tracker, args))
 
     while True:
-        print("\n1. Playlists\n2. Tasks\n3. Update\n4. View\n5. Refresh\n0. Exit")
+        print("\n1. Playlists\n2. Tasks\n3. Update\n4. View\n5. Refresh\n6. Backfill rollups\n7. Import stats\n8. Watch stats folder\n0. Exit")
         main_choice = input("Enter choice: ")
 
         if main_choice == '1':
             while True:
                 print(
-                    "\n1. Create playlist\n2. Edit playlist\n3. View playlist\n4. Delete playlist\n5. Delete all playlists\n0. Exit")
+                    "\n1. Create playlist\n2. Edit playlist\n3. View playlist\n4. Delete playlist\n5. Delete all playlists\n6. Playlist summary\n0. Exit")
                 playlist_choice = input("Enter choice: ")
                 if playlist_choice == '1':
                     tracker.create_playlist()
@@ -378,6 +696,9 @@ if __name__ == "__main__":
                     tracker.delete_playlist(playlist_name)
                 elif playlist_choice == '5':
                     tracker.delete_all_playlists()
+                elif playlist_choice == '6':
+                    playlist_name = input("Enter the playlist name: ")
+                    tracker.view_playlist_summary(playlist_name)
                 elif playlist_choice == '0':
                     break
                 else:
@@ -408,7 +729,7 @@ if __name__ == "__main__":
                     print("Invalid choice. Please try again.")
         if main_choice == '3':
             while True:
-                print("\n1. Choose playlist\n2. Choose task\n3. Update task\n4. View task data\n0. Exit")
+                print("\n1. Choose playlist\n2. Choose task\n3. Update task\n4. View task data\n5. View task history\n0. Exit")
                 update_choice = input("Enter choice: ")
                 if update_choice == '1':
                     tracker.choose_playlist()
@@ -418,13 +739,15 @@ if __name__ == "__main__":
                     tracker.update_task()
                 elif update_choice == '4':
                     tracker.view_task_data()
+                elif update_choice == '5':
+                    tracker.view_task_history()
                 elif update_choice == '0':
                     break
                 else:
                     print("Invalid choice. Please try again.")
         elif main_choice == '4':
             while True:
-                print("\n1. View day\n2. View week\n3. View monthly\n4. View yearly\n5. View all\n0. Exit")
+                print("\n1. View day\n2. View week\n3. View monthly\n4. View yearly\n5. View all\n6. Cache stats\n7. Rolling stats\n8. Trends\n0. Exit")
                 view_choice = input("Enter choice: ")
                 if view_choice == '1':
                     tracker.view_data("day")
@@ -436,12 +759,26 @@ if __name__ == "__main__":
                     tracker.view_data("year")
                 elif view_choice == '5':
                     tracker.view_data("all")
+                elif view_choice == '6':
+                    tracker.view_cache_stats()
+                elif view_choice == '7':
+                    tracker.view_rolling_stats()
+                elif view_choice == '8':
+                    tracker.view_trends()
                 elif view_choice == '0':
                     break
                 else:
                     print("Invalid choice. Please try again.")
         elif main_choice == '5':
             tracker.refresh()
+        elif main_choice == '6':
+            tracker.backfill_rollups()
+        elif main_choice == '7':
+            stats_dir = input("Enter KovaaK's stats folder: ").strip() or os.environ.get("KOVAAKS_STATS_DIR", "")
+            tracker.import_stats(stats_dir)
+        elif main_choice == '8':
+            stats_dir = input("Enter KovaaK's stats folder: ").strip() or os.environ.get("KOVAAKS_STATS_DIR", "")
+            tracker.watch_stats(stats_dir)
         elif main_choice == '0':
             break
         else:
@@ -0,0 +1,147 @@
+import warnings
+from collections import deque
+from datetime import date, timedelta
+
+import numpy as np
+import pandas as pd
+
+WINDOW = 50
+DAYS = 30
+MIN_REPS = 20
+PLATEAU = 0.01
+SIGNIFICANCE = 2.0
+HORIZON = 365
+CHUNK = 256
+COLUMNS = ["reps", "level", "change", "robust_change", "per_day", "status", "next_pr"]
+
+
+def day_ordinal(day):
+    return date.fromisoformat(day).toordinal()
+
+
+def padded(rows, width):
+    matrix = np.full((len(rows), width), np.nan)
+    for index, values in enumerate(rows):
+        values = list(values)[-width:]
+        if values:
+            matrix[index, -len(values):] = values
+    return matrix
+
+
+def ols_slopes(y):
+    x = np.broadcast_to(np.arange(y.shape[1], dtype=np.float64), y.shape)
+    mask = ~np.isnan(y)
+    n = mask.sum(axis=1)
+    sx = np.where(mask, x, 0).sum(axis=1)
+    sy = np.where(mask, y, 0).sum(axis=1)
+    sxx = np.where(mask, x * x, 0).sum(axis=1)
+    sxy = np.where(mask, x * y, 0).sum(axis=1)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        slope = (n * sxy - sx * sy) / (n * sxx - sx * sx)
+        intercept = (sy - slope * sx) / n
+    return slope, intercept
+
+
+def theil_sen_slopes(y):
+    width = y.shape[1]
+    upper = np.triu_indices(width, k=1)
+    steps = (upper[1] - upper[0]).astype(np.float64)
+    slopes = np.empty(len(y))
+    for start in range(0, len(y), CHUNK):
+        chunk = y[start:start + CHUNK]
+        pairwise = (chunk[:, upper[1]] - chunk[:, upper[0]]) / steps
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            slopes[start:start + CHUNK] = np.nanmedian(pairwise, axis=1)
+    return slopes
+
+
+class TrendModel:
+    def __init__(self, window=WINDOW, days=DAYS):
+        self.window = window
+        self.days = days
+        self.recent = {}
+        self.counts = {}
+        self.daily = {}
+        self.best = {}
+        self.rows = {}
+        self.dirty = set()
+        self.computed_on = None
+
+    @classmethod
+    def from_sessions(cls, sessions_by_task, window=WINDOW, days=DAYS):
+        model = cls(window, days)
+        for task, sessions in sessions_by_task.items():
+            model.recent.setdefault(task, deque(maxlen=window))
+            for _, session in sorted(sessions):
+                model.extend(task, session.get("Scores", []), session.get("Date"))
+        return model
+
+    def extend(self, task, scores, day=None):
+        scores = [float(score) for score in scores]
+        self.recent.setdefault(task, deque(maxlen=self.window)).extend(scores)
+        self.counts[task] = self.counts.get(task, 0) + len(scores)
+        if scores:
+            self.best[task] = max(self.best.get(task, scores[0]), *scores)
+            if day:
+                daily = self.daily.setdefault(task, {})
+                ordinal = day_ordinal(day)
+                daily[ordinal] = max(daily.get(ordinal, scores[0]), *scores)
+        self.dirty.add(task)
+
+    def _daily_matrix(self, tasks, today):
+        first = today.toordinal() - self.days + 1
+        matrix = np.full((len(tasks), self.days), np.nan)
+        for row, task in enumerate(tasks):
+            for ordinal, best in self.daily.get(task, {}).items():
+                if first <= ordinal < first + self.days:
+                    matrix[row, ordinal - first] = best
+        return matrix
+
+    def _compute(self, tasks, today):
+        y = padded([self.recent[task] for task in tasks], self.window)
+        reps = np.array([self.counts.get(task, 0) for task in tasks])
+        filled = (~np.isnan(y)).sum(axis=1)
+        with warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            level = np.nanmedian(y, axis=1)
+        slope, intercept = ols_slopes(y)
+        robust = theil_sen_slopes(y)
+        residuals = y - (intercept[:, None] + slope[:, None] * np.arange(self.window))
+        with np.errstate(invalid="ignore", divide="ignore"), warnings.catch_warnings():
+            warnings.simplefilter("ignore", RuntimeWarning)
+            change = slope * (filled - 1) / level
+            robust_change = robust * (filled - 1) / level
+            noise = np.nanstd(residuals, axis=1) * np.sqrt(12 / filled) / level
+        band = np.maximum(PLATEAU, SIGNIFICANCE * noise)
+
+        per_day, intercept = ols_slopes(self._daily_matrix(tasks, today))
+        fitted_today = intercept + per_day * (self.days - 1)
+        best = np.array([self.best.get(task, np.nan) for task in tasks])
+        with np.errstate(invalid="ignore", divide="ignore"):
+            days_to_pr = np.ceil(np.maximum(best - fitted_today, 0) / per_day)
+
+        status = np.select(
+            [filled < MIN_REPS, robust_change <= -band, robust_change >= band],
+            ["insufficient data", "regressing", "improving"],
+            "plateau",
+        )
+        for row, task in enumerate(tasks):
+            next_pr = None
+            if status[row] == "improving" and per_day[row] > 0 and days_to_pr[row] <= HORIZON:
+                next_pr = (today + timedelta(days=int(days_to_pr[row]))).isoformat()
+            self.rows[task] = (reps[row], level[row], change[row], robust_change[row], per_day[row], status[row],
+                               next_pr)
+
+    def table(self, tasks=None, today=None):
+        today = today or date.today()
+        if today != self.computed_on:
+            self.rows = {}
+            self.computed_on = today
+        tasks = sorted(self.recent) if tasks is None else [task for task in tasks if task in self.recent]
+        stale = [task for task in tasks if task in self.dirty or task not in self.rows]
+        if stale:
+            self._compute(stale, today)
+            self.dirty.difference_update(stale)
+        table = pd.DataFrame([self.rows[task] for task in tasks], columns=COLUMNS, index=pd.Index(tasks, name="task"))
+        return table.round({"level": 2, "change": 4, "robust_change": 4, "per_day": 2})
@@ -0,0 +1,134 @@
+import os
+import time
+
+import importer
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+
+class StatsWatcher:
+    def __init__(self, tracker, directory, state_path="import_state.json", flush_interval=1.0, batch_size=50,
+                 settle=1.0, poll_interval=1.0, use_inotify=True, retry_delay=5.0, max_retry_delay=300.0):
+        self.tracker = tracker
+        self.directory = directory
+        self.state_path = state_path
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.settle = settle
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.state = importer.load_state(state_path)
+        self.pending = {}
+        self.ready = []
+        self.last_flush = time.monotonic()
+        self.last_dir_mtime = None
+        self.inotify = None
+        if use_inotify and INotify is not None:
+            self.inotify = INotify()
+            self.inotify.add_watch(directory, flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE)
+
+    def _wait(self):
+        if self.inotify is not None:
+            events = self.inotify.read(timeout=int(self.poll_interval * 1000))
+            return [os.path.join(self.directory, event.name) for event in events
+                    if event.name.endswith("Stats.csv")]
+
+        time.sleep(self.poll_interval)
+        dir_mtime = os.stat(self.directory).st_mtime
+        if dir_mtime == self.last_dir_mtime and not self.pending:
+            return []
+        self.last_dir_mtime = dir_mtime
+        return [path for path, _ in importer.scan_stats_dir(self.directory, self.state)]
+
+    def _track(self, paths):
+        ready = {path for path, _ in self.ready}
+        for path in paths:
+            if path in self.pending or path in ready or os.path.basename(path) in self.state["files"]:
+                continue
+            self.pending[path] = None
+
+    def _settle(self):
+        now = time.monotonic()
+        for path, seen in list(self.pending.items()):
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                del self.pending[path]
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            if seen is None or seen[0] != signature:
+                self.pending[path] = (signature, now)
+            elif now - seen[1] >= self.settle and stat.st_size:
+                del self.pending[path]
+                self.ready.append((path, stat.st_mtime))
+
+    def flush(self):
+        self.ready = [(path, mtime) for path, mtime in self.ready if os.path.exists(path)]
+        if not self.ready:
+            return None
+        runs = [importer.parse_stats_file(path) for path, _ in self.ready]
+        try:
+            summary = importer.ingest_runs(self.tracker, runs, self.state)
+        except Exception:
+            importer.save_state(self.state_path, self.state)
+            raise
+
+        high_water = importer.high_water_mark(self.ready, self.state)
+        pending_mtimes = [seen[0][1] for seen in self.pending.values() if seen is not None]
+        if pending_mtimes:
+            high_water = min(high_water, min(pending_mtimes))
+        self.state["high_water"] = max(self.state.get("high_water", 0), high_water)
+        importer.prune_files(self.directory, self.state)
+        importer.save_state(self.state_path, self.state)
+
+        self.ready = []
+        self.last_flush = time.monotonic()
+        return summary
+
+    def catch_up(self):
+        settled_before = time.time() - self.settle
+        for path, mtime in importer.scan_stats_dir(self.directory, self.state):
+            if mtime < settled_before:
+                self.ready.append((path, mtime))
+            else:
+                self._track([path])
+        return self.flush()
+
+    def step(self):
+        self._track(self._wait())
+        self._settle()
+        due = time.monotonic() - self.last_flush >= self.flush_interval
+        if len(self.ready) >= self.batch_size or (self.ready and due):
+            return self.flush()
+        return None
+
+    def run(self, report=print):
+        try:
+            summary = self.catch_up()
+            if summary and summary["runs"]:
+                report(f"Caught up on {summary['runs']} runs.")
+        except Exception as error:
+            report(f"Could not record runs yet ({error}); they will be retried.")
+        report(f"Watching '{self.directory}' ({'inotify' if self.inotify else 'polling'}). Press Ctrl+C to stop.")
+        delay = self.retry_delay
+        try:
+            while True:
+                try:
+                    summary = self.step()
+                except Exception as error:
+                    report(f"Could not record runs ({error}); retrying in {delay:.0f}s.")
+                    time.sleep(delay)
+                    delay = min(delay * 2, self.max_retry_delay)
+                    continue
+                delay = self.retry_delay
+                if summary and summary["runs"]:
+                    report(f"Recorded {summary['runs']} new runs in {summary['sessions']} sessions.")
+        except KeyboardInterrupt:
+            self.flush()
+        finally:
+            if self.inotify is not None:
+                self.inotify.close()